@@ -1,56 +1,70 @@
-import librosa
 import numpy as np
+import pandas as pd
 import os
+import sys
 import csv
 
+# Shared analysis helpers live alongside the main extraction scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python_files"))
+from pitch_class_profiles import PITCH_CLASS_COLUMNS, update_histograms, merge_profiles
+from key_estimation import key_table
+from stage_trace import enable_tracing
+
 # Define the directory containing the audio files
 directory = '/Users/khoile/Desktop/Updated Project/practice_recordings'
 
 # Define the output CSV file for key profile
 output_csv = '/Users/khoile/Desktop/Updated Project/practice_results/key_profile.csv'
 
-# Initialize a dictionary to store aggregate pitch counts
-pitch_counts = {i: 0 for i in range(12)}  # MIDI pitch class (0-11, representing C-B)
-total_notes = 0
-
-for filename in os.listdir(directory):
-    if filename.endswith(('.m4a', '.wav', '.mp3', '.flac')):
-        file_path = os.path.join(directory, filename)
-        try:
-            y, sr = librosa.load(file_path)
-
-            # Compute STFT and extract dominant frequencies
-            D = librosa.stft(y)
-            frequencies = librosa.fft_frequencies(sr=sr)
-            magnitude = np.abs(D)
-            dominant_freq_indices = np.argmax(magnitude, axis=0)
-            dominant_frequencies = frequencies[dominant_freq_indices]
-
-            # Remove invalid frequencies
-            valid_frequencies = [freq for freq in dominant_frequencies if not np.isnan(freq) and freq > 0]
-
-            # Convert valid frequencies to MIDI pitch class (0-11)
-            valid_midi = [int(librosa.hz_to_midi(freq)) % 12 for freq in valid_frequencies]
-
-            # Count occurrences of each pitch class
-            for midi in valid_midi:
-                pitch_counts[midi] += 1
-                total_notes += 1
-
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
-
-# Normalize to get the average pitch distribution
-if total_notes > 0:
-    pitch_distribution = {pitch: count / total_notes for pitch, count in pitch_counts.items()}
-else:
-    pitch_distribution = {pitch: 0 for pitch in pitch_counts.keys()}
-
-# Write the key profile to a CSV file
-with open(output_csv, mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(['Pitch Class (MIDI)', 'Average Proportion'])
-    for pitch, proportion in pitch_distribution.items():
-        writer.writerow([pitch, proportion])
-
-print(f'Key profile has been saved to {output_csv}')
+# Analyse block-by-block with bounded memory (for hour-long recordings)
+STREAMING = False
+
+# Per-file, per-stage timing trace (JSON lines, see python_files/stage_trace.py); None disables it
+trace_file = None
+if trace_file:
+    enable_tracing(trace_file)
+
+# Per-file histograms are persisted here; only new or changed recordings are
+# counted on later runs (see python_files/pitch_class_profiles.py)
+histogram_csv = '/Users/khoile/Desktop/Updated Project/practice_results/pitch_class_histograms.csv'
+
+# Optional per-group profiles: a CSV with a Filename column plus the columns
+# to group by (e.g. Artist, Year); None skips them
+metadata_csv = None
+group_columns = ['Artist']
+group_output_csv = '/Users/khoile/Desktop/Updated Project/practice_results/key_profile_by_group.csv'
+
+# Count files in parallel (one process per core)
+max_workers = os.cpu_count() or 1
+
+if __name__ == '__main__':
+    histograms = update_histograms(directory, histogram_csv, max_workers=max_workers, streaming=STREAMING)
+
+    # Reduce the per-file counts into the corpus profile
+    pitch_counts = merge_profiles(histograms).loc[0, PITCH_CLASS_COLUMNS].to_numpy(dtype=np.int64)
+
+    # Normalize to get the average pitch distribution
+    total_notes = pitch_counts.sum()
+    if total_notes > 0:
+        pitch_distribution = {pitch: count / total_notes for pitch, count in enumerate(pitch_counts)}
+    else:
+        pitch_distribution = {pitch: 0 for pitch in range(12)}
+
+    # Write the key profile to a CSV file
+    with open(output_csv, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Pitch Class (MIDI)', 'Average Proportion'])
+        for pitch, proportion in pitch_distribution.items():
+            writer.writerow([pitch, proportion])
+
+    print(f'Key profile has been saved to {output_csv}')
+
+    corpus_key = key_table(pitch_counts).iloc[0]
+    print(f"Closest key: {corpus_key['Key']} {corpus_key['Mode']} "
+          f"(r = {corpus_key['Key Correlation']:.2f}, margin {corpus_key['Key Confidence']:.2f})")
+
+    if metadata_csv:
+        profiles = merge_profiles(histograms, pd.read_csv(metadata_csv), group_by=group_columns)
+        profiles = pd.concat([profiles, key_table(profiles[PITCH_CLASS_COLUMNS], index=profiles.index)], axis=1)
+        profiles.to_csv(group_output_csv, index=False)
+        print(f'Key profiles by {", ".join(group_columns)} have been saved to {group_output_csv}')
@@ -1,70 +1,184 @@
 import os
-import scipy.spip3tats
-import re
+import sys
+import functools
 import librosa
 import numpy as np
 import pandas as pd
 
+# Shared analysis helpers live alongside the main extraction scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python_files"))
+from extraction_manifest import ExtractionManifest, checkpoint_row, merge_checkpointed_rows
+from analysis_context import AudioAnalysisContext, HOP_LENGTH, RHYTHM_SR
+from frame_archive import write_frame_features
+from feature_registry import FeatureRegistry, flatten_features
+from stage_trace import enable_tracing, stage, traced_file
+from supervised_workers import Quarantine, run_supervised
+from beat_sync import beats_on_grid
+
 # Directory containing WAV files
 wav_dir = "wav_files"
 
 # Output file for audio features
 output_file = "complete_audio_features.csv"
 
-# Function to extract all available audio features using librosa
-def extract_all_audio_features(file_path):
+# Resume manifest for incremental re-runs; bump the version when features change
+manifest_file = output_file + ".manifest.json"
+EXTRACTOR_VERSION = "3"
+
+# Optional columnar feature store (see python_files/feature_store.py); None disables it.
+# Readers select rows by corpus name, so it has to be set with the store.
+feature_store_dir = None
+corpus = None
+
+# Frame-level feature archive for windowed statistics without re-decoding
+# (see python_files/frame_archive.py); None disables it
+frame_archive_dir = None
+
+# Features to extract (None = every registered feature). A subset changes the
+# column layout, so write it to a different output_file.
+features_to_extract = None
+
+# Worker processes: files analysed in parallel, wall-clock limit per file in
+# seconds and memory ceiling per worker in MB (None disables them).
+# Files that fail are listed with the reason in quarantine_file.
+max_workers = 1
+worker_timeout = 30 * 60
+worker_memory_limit_mb = None
+quarantine_file = output_file + ".quarantine.json"
+
+# Reduce every frame-level feature to one column per beat (the mean of the
+# beat's frames) before the per-file mean, so each beat weighs the same
+# however many frames it spans. Beats come from the RHYTHM_SR analysis; the
+# frame archive keeps the frame-level matrices either way.
+beat_synchronous = False
+
+# Per-file, per-stage timing trace (JSON lines, see python_files/stage_trace.py); None disables it
+trace_file = None
+
+# Feature registry: each feature is a function of the file's
+# AudioAnalysisContext and declares the intermediates it needs, so a run only
+# computes the dependency closure of the features it asks for. Features share
+# one STFT (spectral features, chroma_stft, MFCC via the mel spectrogram, HPSS),
+# one CQT for chroma_cqt/chroma_cens, and the harmonic component's CQT for
+# tonnetz. Tempo declares RHYTHM_SR and runs on a resampled copy with a
+# smaller STFT of its own.
+LIBROSA_FEATURES = FeatureRegistry()
+
+# Frame-level features are reduced to their per-file mean (a scalar, or one
+# value per row for vector features), per beat first with beat_synchronous.
+# The frame matrix is kept on the context so it can be written to the frame
+# archive.
+def add_frame_feature(name, frames, needs, vector=False):
+    def compute(ctx, _):
+        matrix = frames(ctx)
+        ctx.frame_features[name] = matrix
+        if beat_synchronous:
+            matrix = librosa.util.sync(matrix, beats_on_grid(ctx.at_rate(RHYTHM_SR), ctx), aggregate=np.mean)
+        return np.mean(matrix, axis=1).tolist() if vector else np.mean(matrix.flatten())
+    if beat_synchronous:
+        needs = [*needs, ("beat_frames", RHYTHM_SR)]
+    LIBROSA_FEATURES.add(name, compute, needs=needs)
+
+LIBROSA_FEATURES.add("duration", lambda ctx, _: ctx.duration, needs=["duration"])
+add_frame_feature("zero_crossing_rate", lambda ctx: librosa.feature.zero_crossing_rate(y=ctx.y), ["y"])
+add_frame_feature("energy", lambda ctx: librosa.feature.rms(y=ctx.y), ["y"])
+add_frame_feature("spectral_centroid", lambda ctx: librosa.feature.spectral_centroid(S=ctx.stft_magnitude, sr=ctx.sr), ["stft_magnitude"])
+add_frame_feature("spectral_bandwidth", lambda ctx: librosa.feature.spectral_bandwidth(S=ctx.stft_magnitude, sr=ctx.sr), ["stft_magnitude"])
+add_frame_feature("spectral_contrast", lambda ctx: librosa.feature.spectral_contrast(S=ctx.stft_magnitude, sr=ctx.sr), ["stft_magnitude"], vector=True)
+add_frame_feature("spectral_flatness", lambda ctx: librosa.feature.spectral_flatness(S=ctx.stft_magnitude), ["stft_magnitude"])
+add_frame_feature("spectral_rolloff", lambda ctx: librosa.feature.spectral_rolloff(S=ctx.stft_magnitude, sr=ctx.sr), ["stft_magnitude"])
+add_frame_feature("chroma_stft", lambda ctx: librosa.feature.chroma_stft(S=ctx.stft_power, sr=ctx.sr), ["stft_power"], vector=True)
+add_frame_feature("chroma_cqt", lambda ctx: ctx.chroma_cqt, ["chroma_cqt"], vector=True)
+add_frame_feature("chroma_cens", lambda ctx: librosa.feature.chroma_cens(C=ctx.cqt_magnitude, sr=ctx.sr), ["cqt_magnitude"], vector=True)
+add_frame_feature("tonnetz", lambda ctx: librosa.feature.tonnetz(chroma=ctx.harmonic_chroma_cqt, sr=ctx.sr), ["harmonic_chroma_cqt"], vector=True)
+add_frame_feature("mfcc", lambda ctx: librosa.feature.mfcc(S=ctx.log_mel_spectrogram, sr=ctx.sr), ["log_mel_spectrogram"], vector=True)
+LIBROSA_FEATURES.add("tempo", lambda ctx, _: librosa.beat.tempo(onset_envelope=ctx.onset_envelope, sr=ctx.sr, hop_length=ctx.hop_length)[0],
+                     needs=["onset_envelope"], sr=RHYTHM_SR)
+LIBROSA_FEATURES.check()
+
+# Extract the requested features (all of them by default) as one flat row;
+# vector features are expanded into <name>_1..<name>_n columns. With an
+# archive_dir the frame-level matrices are archived as well.
+def extract_features(file_path, feature_names=None, archive_dir=None):
+    with traced_file(file_path):
+        # Audio is loaded at its native rate (cached) the first time a feature needs it
+        ctx = AudioAnalysisContext(file_path, sr=None)
+        values = LIBROSA_FEATURES.compute(ctx, feature_names)
+        if archive_dir:
+            with stage("frame_archive"):
+                write_frame_features(archive_dir, os.path.basename(file_path), ctx.frame_features,
+                                     ctx.sr, HOP_LENGTH)
+
+    return {"filename": os.path.basename(file_path), **flatten_features(values)}
+
+
+# Same, printing the error and returning None when the file fails
+def extract_all_audio_features(file_path, feature_names=None, archive_dir=None):
     try:
-        y, sr = librosa.load(file_path, sr=None)  # Load audio file
-
-        # Core audio features
-        features = {
-            "filename": os.path.basename(file_path),
-            "duration": librosa.get_duration(y=y, sr=sr),
-            "zero_crossing_rate": np.mean(librosa.feature.zero_crossing_rate(y=y).flatten()),
-            "energy": np.mean(librosa.feature.rms(y=y).flatten()),
-            "spectral_centroid": np.mean(librosa.feature.spectral_centroid(y=y, sr=sr).flatten()),
-            "spectral_bandwidth": np.mean(librosa.feature.spectral_bandwidth(y=y, sr=sr).flatten()),
-            "spectral_contrast": np.mean(librosa.feature.spectral_contrast(y=y, sr=sr), axis=1).tolist(),
-            "spectral_flatness": np.mean(librosa.feature.spectral_flatness(y=y).flatten()),
-            "spectral_rolloff": np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr).flatten()),
-            "chroma_stft": np.mean(librosa.feature.chroma_stft(y=y, sr=sr), axis=1).tolist(),
-            "chroma_cqt": np.mean(librosa.feature.chroma_cqt(y=y, sr=sr), axis=1).tolist(),
-            "chroma_cens": np.mean(librosa.feature.chroma_cens(y=y, sr=sr), axis=1).tolist(),
-            "tonnetz": np.mean(librosa.feature.tonnetz(y=librosa.effects.harmonic(y), sr=sr), axis=1).tolist(),
-            "mfcc": np.mean(librosa.feature.mfcc(y=y, sr=sr), axis=1).tolist(),
-            "tempo": librosa.beat.tempo(y=y, sr=sr)[0],
-        }
-
-        return features
+        return extract_features(file_path, feature_names, archive_dir)
     except Exception as e:
         print(f"Error processing {file_path}: {e}")
         return None
 
-# Analyze all WAV files in the directory
-audio_features = []
-for wav_file in os.listdir(wav_dir):
-    if wav_file.endswith(".wav"):
-        file_path = os.path.join(wav_dir, wav_file)
-        features = extract_all_audio_features(file_path)
-        if features:
-            audio_features.append(features)
-
-# Convert results to a DataFrame
-features_df = pd.DataFrame(audio_features)
-
-# Expand list-based features (e.g., spectral contrast, chroma, tonnetz, mfcc) into individual columns
-def expand_feature_column(df, column_name, prefix, count):
-    expanded_columns = pd.DataFrame(df[column_name].tolist(), columns=[f"{prefix}_{i+1}" for i in range(count)])
-    return pd.concat([df.drop(columns=[column_name]), expanded_columns], axis=1)
-
-features_df = expand_feature_column(features_df, "spectral_contrast", "spectral_contrast", 7)  # 7 spectral contrast bands
-features_df = expand_feature_column(features_df, "chroma_stft", "chroma_stft", 12)  # 12 chroma bins
-features_df = expand_feature_column(features_df, "chroma_cqt", "chroma_cqt", 12)  # 12 chroma bins
-features_df = expand_feature_column(features_df, "chroma_cens", "chroma_cens", 12)  # 12 chroma bins
-features_df = expand_feature_column(features_df, "tonnetz", "tonnetz", 6)  # 6 tonnetz dimensions
-features_df = expand_feature_column(features_df, "mfcc", "mfcc", 20)  # Default 20 MFCC coefficients
-
-# Save features to a CSV file
-features_df.to_csv(output_file, index=False)
-
-print(f"All audio features saved to {output_file}")
\ No newline at end of file
+if __name__ == "__main__":
+    if feature_store_dir and not corpus:
+        sys.exit("🚨 Set corpus (e.g. 'control') to write to the feature store")
+    if trace_file:
+        enable_tracing(trace_file)
+
+    # The manifest version covers the feature selection and beat_synchronous so changing them re-extracts
+    manifest_version = EXTRACTOR_VERSION
+    if features_to_extract is not None:
+        manifest_version += ":" + ",".join(sorted(features_to_extract))
+    if beat_synchronous:
+        manifest_version += ":beats"
+    manifest = ExtractionManifest(manifest_file, manifest_version)
+
+    feature_order, intermediates = LIBROSA_FEATURES.resolve(features_to_extract)
+    print(f"🧮 Features: {', '.join(feature_order)}")
+    print(f"🧱 Intermediates: {', '.join(intermediates)}")
+    rates = LIBROSA_FEATURES.rates(features_to_extract)
+    print(f"🎚️ Sample rates: {', '.join('native' if sr is None else f'{sr} Hz' for sr in rates)}")
+
+    # Analyze new or changed WAV files in the directory, checkpointing each row as it finishes.
+    # Every file runs in its own supervised process; failures, crashes and
+    # timeouts are quarantined and skipped on later runs.
+    wav_paths = [os.path.join(wav_dir, f) for f in sorted(os.listdir(wav_dir)) if f.endswith(".wav")]
+    quarantine = Quarantine(quarantine_file)
+    pending = [path for path in manifest.pending(wav_paths) if manifest.content_hash(path) not in quarantine]
+    new_rows = []
+
+    def checkpoint(file_path, features):
+        row_df = pd.DataFrame([features])
+        checkpoint_row(output_file, list(row_df.columns), row_df.iloc[0].tolist())
+        manifest.mark_done(file_path)
+        new_rows.append(row_df)
+
+    def quarantine_failed(file_path, reason):
+        quarantine.add(manifest.content_hash(file_path), file_path, reason)
+
+    # A feature selection that changes the columns can't be appended to an
+    # output written with another layout; the first row stops the run
+    try:
+        failures = run_supervised(
+            pending, functools.partial(extract_features, feature_names=features_to_extract,
+                                       archive_dir=frame_archive_dir),
+            max_workers=max_workers, timeout=worker_timeout, memory_limit_mb=worker_memory_limit_mb,
+            on_row=checkpoint, on_failure=quarantine_failed,
+        )
+    except ValueError as e:
+        sys.exit(f"🚨 {e}")
+    if failures:
+        print(f"⚠️ {len(failures)} file(s) quarantined in {quarantine_file}")
+
+    # Merge new rows with the results of earlier runs
+    merge_checkpointed_rows(output_file, "filename")
+
+    if feature_store_dir and new_rows:
+        from feature_store import append_features, new_run_id, run_mode
+        mode = run_mode(features_to_extract and "features+" + "+".join(sorted(features_to_extract)),
+                        beat_synchronous and "beats")
+        append_features(feature_store_dir, pd.concat(new_rows, ignore_index=True),
+                        corpus, EXTRACTOR_VERSION, new_run_id(), key_column="filename", mode=mode)
+
+    print(f"All audio features saved to {output_file}")
@@ -1,84 +1,64 @@
 import os
+import sys
 import librosa
 import numpy as np
 import scipy.stats
 import pandas as pd
 
+# Shared analysis helpers live alongside the main extraction scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python_files"))
+from analysis_context import AudioAnalysisContext
+from pitch_classes import INVALID_MIDI, frames_at_interval
+from note_sequences import NoteSequenceStore
+from beat_sync import beat_mode, segment_times
 
-# Analysis functions
-def onset_density(y, sr):
-    onsets = librosa.onset.onset_detect(y=y, sr=sr, units="time")
-    return len(onsets) / (len(y) / sr)
 
+# Analysis functions (all of them share one AudioAnalysisContext per file)
+def onset_density(ctx):
+    return len(ctx.onset_times) / (len(ctx.y) / ctx.sr)
 
-def clock_density(y, sr):
-    _, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
-    beats = len(beat_frames)
-    duration = librosa.get_duration(y=y, sr=sr)
-    return beats / duration
 
+def clock_density(ctx):
+    beats = len(ctx.beat_frames)
+    return beats / ctx.duration
 
-def tempo_estimates(y, sr):
-    tempos = librosa.beat.tempo(y=y, sr=sr)
-    return tempos[0]
-
-
-def dominant_frequencies_and_notes(y, sr, interval=0.5):
-    # Compute the Short-Time Fourier Transform (STFT)
-    D = librosa.stft(y)
-
-    # Convert the STFT into frequencies
-    frequencies = librosa.fft_frequencies(sr=sr)
-
-    # Get the magnitude spectrum (energy at each frequency)
-    magnitude = np.abs(D)
-
-    # Find the dominant frequency (highest energy) in each frame
-    dominant_freq_indices = np.argmax(magnitude, axis=0)
-    dominant_frequencies = frequencies[dominant_freq_indices]
 
-    # Replace zero frequencies with NaN for invalid frames
-    dominant_frequencies[dominant_frequencies == 0] = np.nan
-
-    # Convert frame indices to time
-    frame_times = librosa.frames_to_time(np.arange(len(dominant_frequencies)), sr=sr)
+def tempo_estimates(ctx):
+    tempos = librosa.beat.tempo(onset_envelope=ctx.onset_envelope, sr=ctx.sr)
+    return tempos[0]
 
-    # Select data at regular intervals
-    selected_times = np.arange(0, frame_times[-1], interval)  # Interval in seconds
-    selected_indices = np.searchsorted(frame_times, selected_times)
 
-    # Convert dominant frequencies to notes
-    dominant_notes = []
-    for freq in dominant_frequencies:
-        if np.isnan(freq):  # Handle NaN
-            dominant_notes.append("Invalid")
-        else:
-            dominant_notes.append(librosa.hz_to_note(freq))
+# One note per beat (the most frequent dominant MIDI note among the beat's
+# frames) or, with an interval in seconds, the single frame at every multiple
+# of it as before
+def dominant_note_sequence(ctx, interval=None):
+    # Dominant STFT bin of every frame as MIDI, computed on the shared STFT
+    midi = ctx.dominant_midi
 
-    # Collect results at selected intervals
-    results = []
-    for t, idx in zip(selected_times, selected_indices):
-        freq = dominant_frequencies[idx]
-        note = dominant_notes[idx]
-        if not np.isnan(freq):
-            results.append({"time": t, "frequency": freq, "note": note})
-        else:
-            results.append({"time": t, "frequency": None, "note": "Invalid"})
+    if interval is None:
+        selected_times = segment_times(ctx.beat_frames, len(midi), ctx.frame_times)
+        selected_midi = beat_mode(midi, ctx.beat_frames, 128)
+    else:
+        # Select data at regular intervals (interval in seconds)
+        selected_indices = frames_at_interval(ctx.frame_times, interval)
+        selected_times = np.arange(len(selected_indices)) * interval
+        selected_midi = midi[selected_indices]
 
-    return results
+    # Sampled times, MIDI note numbers and validity mask as arrays
+    return selected_times, selected_midi, selected_midi != INVALID_MIDI
 
 
 # Main analysis function
 def analyze_audio(file):
-    y, sr = librosa.load(file)
+    ctx = AudioAnalysisContext(file)
 
     # Perform analyses
     return {
         "file_name": os.path.basename(file),
-        "onset_density": onset_density(y, sr),
-        "clock_density": clock_density(y, sr),
-        "tempo_estimates": tempo_estimates(y, sr),
-        "dominant_notes": dominant_frequencies_and_notes(y, sr),
+        "onset_density": onset_density(ctx),
+        "clock_density": clock_density(ctx),
+        "tempo_estimates": tempo_estimates(ctx),
+        "dominant_notes": dominant_note_sequence(ctx, note_interval),
     }
 
 
@@ -86,27 +66,33 @@ def analyze_audio(file):
 wav_dir = "wav_files"
 output_file = "complete_audio_features_with_notes.csv"
 
+# Binary note-sequence store (see python_files/note_sequences.py)
+note_sequence_dir = "dominant_note_sequences"
+
+# Seconds between sampled notes; None samples one note per beat
+note_interval = None
+
 # Get all WAV files
 audio_files = [os.path.join(wav_dir, f) for f in os.listdir(wav_dir) if f.endswith(".wav")]
 
 # Analyze each file and save results
 results = []
+note_store = NoteSequenceStore(note_sequence_dir)
 for file in audio_files:
     analysis = analyze_audio(file)
 
-    # Flatten dominant notes into a string for CSV storage
-    dominant_notes_summary = "; ".join(
-        f"{note['time']:.2f}s: {note['note']}" for note in analysis["dominant_notes"]
-    )
-    analysis["dominant_notes_summary"] = dominant_notes_summary
-
-    # Remove raw dominant notes from the main output (optional)
-    del analysis["dominant_notes"]
+    # Dominant notes go to the binary note-sequence store instead of a text summary in the CSV
+    times, midi, valid = analysis.pop("dominant_notes")
+    note_store.add(analysis["file_name"], times, midi, valid)
+    analysis["dominant_note_count"] = int(valid.sum())
 
     results.append(analysis)
 
+note_store.save()
+
 # Save results to a CSV file
 df = pd.DataFrame(results)
 df.to_csv(output_file, index=False)
 
 print(f"Results saved to {output_file}")
+print(f"Dominant note sequences saved to {note_sequence_dir}")
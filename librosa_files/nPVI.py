@@ -1,39 +1,157 @@
 import re
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Shared analysis helpers live alongside the main extraction scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python_files"))
+from extraction_manifest import file_content_hash
+from rhythm_variability import RHYTHM_VARIABILITY_COLUMNS, batch_rhythm_variability
+
+## patterns are compiled once instead of on every line.
+METADATA_CHARS = re.compile("[!=*]")
+NON_RHYTHM_CHARS = re.compile("[^0-9._\]\[]")
 
 def recip_rhythm(tune):
 
-  melody = [line.rstrip() for line in open(tune, "r+")]
-  ## define some empty lists that we might need later.
-  x = []
-  y = []
+  with open(tune, "r") as f:
+    melody = [line.rstrip() for line in f]
+
+  ## for every line in the melody, if there is no !, =, or *, keep the line.
+  ## this gets rid of metadata and barlines. Everything but the rhythm
+  ## characters is stripped from what is left.
 
-  ## for every line in the melody, if there is no !, =, or *, print the line.
-  ## this gets rid of metadata and barlines. It puts everything into the
-  ## x list.
+  x = [NON_RHYTHM_CHARS.sub("", f) for f in melody if not METADATA_CHARS.search(f)]
 
-  for f in melody:
-    if "!" not in f and "=" not in f and "*" not in f:
-      x.append(re.sub("[^0-9._\]\[]", "", f))
+  ## durations without a dot are 1/n, dotted ones 1.5/n (all dots removed).
+  dotted = np.array(["." in i for i in x], dtype=bool)
+  values = np.array([float(i.replace(".", "")) for i in x], dtype=np.float64)
+  if (values == 0).any():
+    raise ZeroDivisionError("float division by zero")
+  recip = 1 / values
+  y = np.where(dotted, recip + (recip * .5), recip)
 
-  for i in x:
-    if "." not in i:
-      i = float(i)
-      recip = 1/i
-      y.append(recip)
+  return(y.tolist())
 
-    else:
-      no_dot = re.sub("\.", "", i)
-      no_dot = float(no_dot)
-      recip = (1/no_dot)+((1/no_dot)*.5)
-      y.append(recip)
 
-  return(y)
+## nPVI over an array of reciprocal durations. The formula is kept exactly as
+## in the original loop (including its operator precedence), just vectorized.
+## It is NOT the Grabe & Low nPVI: it computes |a - b/(a + b/2)| per pair
+## rather than |a - b| / ((a + b)/2). The corpus table reports it as the
+## legacy value next to the standard one (see grabe_low_npvi).
+def npvi_value(rhythm):
+  rhythm = np.asarray(rhythm, dtype=np.float64)
+  mel_length = 100/(len(rhythm) - 1)
+  a, b = rhythm[:-1], rhythm[1:]
+  total = np.abs(a - b/(a + b/2))
+  return(mel_length * float(total.sum()))
 
 
 def npvi(tune):
   rhythm = recip_rhythm(tune)
-  mel_length = 100/(len(rhythm) - 1)
-  total = [abs(rhythm[onset] - (rhythm[onset+1])/(rhythm[onset] + (rhythm[onset+1]/2))) for onset in range(len(rhythm)-1)]
-  total_sum = sum(total)
-  answer = (mel_length * total_sum)
-  return([tune, answer])
\ No newline at end of file
+  answer = npvi_value(rhythm)
+  return([tune, answer])
+
+
+## Standard (Grabe & Low) nPVI of every reciprocal-duration array, in one
+## vectorized pass. Durations are turned into onset times so the same code as
+## the audio IOI metrics in python_files/rhythm_variability.py is used, and
+## the two columns can be compared directly.
+def grabe_low_npvi(rhythms):
+  onsets = [np.concatenate(([0.0], np.cumsum(rhythm))) for rhythm in rhythms]
+  return batch_rhythm_variability(onsets)[:, RHYTHM_VARIABILITY_COLUMNS.index('IOI nPVI')]
+
+
+## CORPUS MODE
+## Parsed reciprocal-duration arrays are cached in one .npz keyed by file
+## content hash, so an unchanged tune is never parsed twice (even if it is
+## renamed or moved to another directory).
+class RhythmIndex:
+  def __init__(self, path):
+    self.path = path
+    self.arrays = {}
+    if path and os.path.exists(path):
+      with np.load(path) as data:
+        self.arrays = {key: data[key] for key in data.files}
+    self.changed = False
+
+  def get(self, content_hash):
+    return self.arrays.get(content_hash)
+
+  def add(self, content_hash, rhythm):
+    self.arrays[content_hash] = np.asarray(rhythm, dtype=np.float64)
+    self.changed = True
+
+  ## write to a temp file and swap it in so a crash never leaves a half-written index
+  def save(self):
+    if not self.path or not self.changed:
+      return
+    tmp_path = self.path + ".tmp.npz"
+    np.savez(tmp_path, **self.arrays)
+    os.replace(tmp_path, self.path)
+    self.changed = False
+
+
+def parse_tune(tune):
+  return(np.asarray(recip_rhythm(tune), dtype=np.float64))
+
+
+## one row per .krn file in `directory`: filename, number of durations, the
+## original formula's value (nPVI (legacy)) and the Grabe & Low nPVI.
+## new or changed files are parsed in a process pool; failures are reported
+## and returned instead of stopping the run.
+def corpus_npvi(directory, index_path=None, max_workers=None):
+  tunes = [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith(".krn")]
+  index = RhythmIndex(index_path)
+  hashes = {tune: file_content_hash(tune) for tune in tunes}
+
+  pending = sorted({hashes[tune]: tune for tune in tunes if index.get(hashes[tune]) is None}.values())
+  print(f"🔁 {len(tunes) - len(pending)} tune(s) cached, {len(pending)} to parse")
+
+  failures = []
+  if pending:
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+      futures = {executor.submit(parse_tune, tune): tune for tune in pending}
+      for future in as_completed(futures):
+        tune = futures[future]
+        try:
+          index.add(hashes[tune], future.result())
+        except Exception as e:
+          failures.append((tune, repr(e)))
+          print(f"❌ Error parsing {tune}: {e}")
+    index.save()
+
+  rows, rhythms = [], []
+  for tune in tunes:
+    rhythm = index.get(hashes[tune])
+    if rhythm is None:
+      continue
+    try:
+      rows.append([os.path.basename(tune), len(rhythm), npvi_value(rhythm)])
+      rhythms.append(rhythm)
+    except ZeroDivisionError:
+      failures.append((tune, "fewer than two durations"))
+  table = pd.DataFrame(rows, columns=["Filename", "Durations", "nPVI (legacy)"])
+  table["nPVI"] = grabe_low_npvi(rhythms) if rhythms else []
+  return table, failures
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="nPVI for every Humdrum **kern file in a directory.")
+  parser.add_argument("directory", help="Directory of .krn files")
+  parser.add_argument("--output", default="npvi_corpus.csv")
+  parser.add_argument("--index", default=None,
+                      help="Parsed-rhythm cache (defaults to <output>.rhythms.npz)")
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+  args = parser.parse_args()
+
+  table, failures = corpus_npvi(args.directory, args.index or args.output + ".rhythms.npz", args.workers)
+  table.to_csv(args.output, index=False)
+  if failures:
+    print(f"⚠️ {len(failures)} file(s) failed:")
+    for tune, error in failures:
+      print(f"  {tune}: {error}")
+  print(f"nPVI for {len(table)} tune(s) saved to {args.output}")
@@ -0,0 +1,248 @@
+import librosa
+import numpy as np
+from fractions import Fraction
+from functools import cached_property
+from scipy.signal import resample_poly
+from pitch_classes import dominant_midi
+from audio_cache import load_audio
+from stage_trace import stage, traced_property
+
+# Analysis parameters shared by every extractor (the librosa defaults the
+# scripts were already relying on)
+DEFAULT_SR = 22050
+N_FFT = 2048
+HOP_LENGTH = 512
+
+# Onset, beat and tempo analysis only needs the low end of the spectrum;
+# rhythm features run on a half-rate copy of the signal (see at_rate)
+RHYTHM_SR = 11025
+
+# chroma_cqt / chroma_cens defaults: 7 octaves at 36 bins per octave from C1
+CQT_BINS_PER_OCTAVE = 36
+CQT_N_BINS = 7 * CQT_BINS_PER_OCTAVE
+
+# What each AudioAnalysisContext intermediate is computed from, used by the
+# feature registry to plan the minimal set of intermediates for a run
+INTERMEDIATE_DEPENDENCIES = {
+    "y": (),
+    "duration": ("y",),
+    "stft": ("y",),
+    "stft_magnitude": ("stft",),
+    "stft_power": ("stft_magnitude",),
+    "fft_frequencies": (),
+    "n_frames": ("stft_magnitude",),
+    "frame_times": ("n_frames",),
+    "dominant_midi": ("stft_magnitude", "fft_frequencies"),
+    "mel_spectrogram": ("stft_power",),
+    "log_mel_spectrogram": ("mel_spectrogram",),
+    "onset_envelope": ("log_mel_spectrogram",),
+    "tempo": ("onset_envelope",),
+    "beat_frames": ("onset_envelope",),
+    "plp": ("onset_envelope",),
+    "onset_frames": ("onset_envelope",),
+    "onset_times": ("onset_frames",),
+    "y_harmonic": ("stft",),
+    "cqt_magnitude": ("y",),
+    "harmonic_cqt_magnitude": ("y_harmonic",),
+    "chroma_cqt": ("cqt_magnitude",),
+    "harmonic_chroma_cqt": ("harmonic_cqt_magnitude",),
+}
+
+
+# STFT size and hop at `sr`, scaled from the DEFAULT_SR analysis so frames keep
+# the same duration (hop_length / sr) at every rate
+def frame_parameters(sr):
+    scale = sr / DEFAULT_SR
+    return int(round(N_FFT * scale)), int(round(HOP_LENGTH * scale))
+
+
+# Resample with a polyphase filter (exact rational ratio, e.g. 1:2 for
+# 22050 -> 11025), which is much cheaper than librosa's default resampler
+def polyphase_resample(y, orig_sr, target_sr):
+    ratio = Fraction(int(target_sr), int(orig_sr))
+    return resample_poly(y, ratio.numerator, ratio.denominator).astype(np.float32)
+
+
+# Per-file analysis context. Every intermediate (signal, STFT magnitude, mel
+# spectrogram, onset envelope, beats, PLP) is computed the first time a metric
+# asks for it and then reused by every other metric on the same file.
+# Intermediates computed elsewhere (e.g. by the streaming analyser) can be
+# passed in by name and are used as-is.
+class AudioAnalysisContext:
+    def __init__(self, file_path=None, y=None, sr=DEFAULT_SR, n_fft=N_FFT, hop_length=HOP_LENGTH, **intermediates):
+        if file_path is None and y is None and not intermediates:
+            raise ValueError("AudioAnalysisContext needs a file path, a signal or precomputed intermediates.")
+        self.file_path = file_path
+        self._sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self._root = self
+        self._rates = {}
+        self._precomputed = bool(intermediates)
+        # Frame-level matrices kept by extractors for the frame archive
+        self.frame_features = {}
+        if y is not None:
+            self.__dict__["y"] = y
+        for name, value in intermediates.items():
+            if not isinstance(getattr(type(self), name, None), cached_property):
+                raise TypeError(f"Unknown analysis intermediate: {name}")
+            self.__dict__[name] = value
+
+    # Decoded mono signal (sr=None keeps the native sample rate), served from
+    # the decoded-audio cache when possible
+    @traced_property(name="load")
+    def y(self):
+        y, self._sr = load_audio(self.file_path, sr=self._sr)
+        return y
+
+    @property
+    def sr(self):
+        if self._sr is None:
+            self.y  # native rate is only known after decoding
+        return self._sr
+
+    # The same recording at another sample rate, for features that declare
+    # one. The signal is decoded once (this context's) and resampled once per
+    # rate with a polyphase filter. n_fft and hop_length come from
+    # frame_parameters, so derived contexts share the frame grid of a
+    # DEFAULT_SR root; a root at any other rate (librosa_work's native-rate
+    # context) keeps N_FFT and HOP_LENGTH, so its frames don't line up with
+    # the derived ones and have to be matched by time (beat_sync.beats_on_grid).
+    # Contexts built from precomputed intermediates have no signal to
+    # resample; they only know the rates attached with add_rate.
+    def at_rate(self, sr):
+        root = self._root
+        if sr is None or sr == root.sr:
+            return root
+        if sr not in root._rates:
+            if root._precomputed:
+                raise ValueError(f"No {sr} Hz analysis was precomputed for {root.file_path}")
+            with stage(f"resample_{sr}"):
+                y = polyphase_resample(root.y, root.sr, sr)
+            n_fft, hop_length = frame_parameters(sr)
+            root.add_rate(AudioAnalysisContext(root.file_path, y=y, sr=sr, n_fft=n_fft, hop_length=hop_length))
+        return root._rates[sr]
+
+    # Attach `ctx` as this recording's analysis at ctx.sr
+    def add_rate(self, ctx):
+        ctx._root = self
+        self._rates[ctx.sr] = ctx
+        return ctx
+
+    @cached_property
+    def duration(self):
+        return librosa.get_duration(y=self.y, sr=self.sr)
+
+    # Complex STFT, computed once and shared by the magnitude features and HPSS
+    @traced_property
+    def stft(self):
+        return librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length)
+
+    # STFT magnitude, shared by the pitch metrics, spectral features and the mel spectrogram
+    @traced_property
+    def stft_magnitude(self):
+        return np.abs(self.stft)
+
+    @cached_property
+    def stft_power(self):
+        return self.stft_magnitude ** 2
+
+    @cached_property
+    def fft_frequencies(self):
+        return librosa.fft_frequencies(sr=self.sr, n_fft=self.n_fft)
+
+    @cached_property
+    def n_frames(self):
+        return self.stft_magnitude.shape[1]
+
+    @cached_property
+    def frame_times(self):
+        return librosa.frames_to_time(np.arange(self.n_frames), sr=self.sr, hop_length=self.hop_length)
+
+    # Dominant STFT bin of every frame as MIDI (-1 where invalid)
+    @traced_property
+    def dominant_midi(self):
+        return dominant_midi(self.stft_magnitude, self.fft_frequencies)
+
+    # Power mel spectrogram built from the shared STFT instead of a second one
+    @traced_property
+    def mel_spectrogram(self):
+        return librosa.feature.melspectrogram(S=self.stft_power, sr=self.sr)
+
+    @traced_property
+    def log_mel_spectrogram(self):
+        return librosa.power_to_db(self.mel_spectrogram)
+
+    # Same envelope librosa derives internally for beat_track, plp and onset_detect.
+    # n_fft sets the centring delay (n_fft // (2 * hop_length) frames), which
+    # librosa would otherwise take from its 2048 default at every rate.
+    @traced_property
+    def onset_envelope(self):
+        return librosa.onset.onset_strength(
+            S=self.log_mel_spectrogram, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length
+        )
+
+    @traced_property
+    def _beat_track(self):
+        tempo, beat_frames = librosa.beat.beat_track(
+            onset_envelope=self.onset_envelope, sr=self.sr, hop_length=self.hop_length
+        )
+        tempo = tempo.item() if isinstance(tempo, np.ndarray) else tempo
+        return tempo, beat_frames
+
+    @property
+    def tempo(self):
+        return self._beat_track[0]
+
+    @property
+    def beat_frames(self):
+        return self._beat_track[1]
+
+    # Predominant local pulse curve
+    @traced_property
+    def plp(self):
+        return librosa.beat.plp(
+            onset_envelope=self.onset_envelope, sr=self.sr, hop_length=self.hop_length
+        )
+
+    @traced_property
+    def onset_frames(self):
+        return librosa.onset.onset_detect(
+            onset_envelope=self.onset_envelope, sr=self.sr, hop_length=self.hop_length
+        )
+
+    @cached_property
+    def onset_times(self):
+        return librosa.frames_to_time(self.onset_frames, sr=self.sr, hop_length=self.hop_length)
+
+    # Harmonic component, as librosa.effects.harmonic(y) but separated from the
+    # shared STFT instead of a fresh one
+    @traced_property
+    def y_harmonic(self):
+        harmonic_stft, _ = librosa.decompose.hpss(self.stft)
+        return librosa.istft(harmonic_stft, hop_length=self.hop_length, length=len(self.y))
+
+    # One constant-Q magnitude per signal, shared by chroma_cqt and chroma_cens
+    @traced_property
+    def cqt_magnitude(self):
+        return np.abs(librosa.cqt(
+            self.y, sr=self.sr, hop_length=self.hop_length,
+            n_bins=CQT_N_BINS, bins_per_octave=CQT_BINS_PER_OCTAVE,
+        ))
+
+    @traced_property
+    def harmonic_cqt_magnitude(self):
+        return np.abs(librosa.cqt(
+            self.y_harmonic, sr=self.sr, hop_length=self.hop_length,
+            n_bins=CQT_N_BINS, bins_per_octave=CQT_BINS_PER_OCTAVE,
+        ))
+
+    @traced_property
+    def chroma_cqt(self):
+        return librosa.feature.chroma_cqt(C=self.cqt_magnitude, sr=self.sr, bins_per_octave=CQT_BINS_PER_OCTAVE)
+
+    @traced_property
+    def harmonic_chroma_cqt(self):
+        return librosa.feature.chroma_cqt(
+            C=self.harmonic_cqt_magnitude, sr=self.sr, bins_per_octave=CQT_BINS_PER_OCTAVE
+        )
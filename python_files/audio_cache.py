@@ -0,0 +1,99 @@
+import os
+import json
+import glob
+import librosa
+import numpy as np
+from extraction_manifest import file_content_hash
+
+# On-disk cache of decoded, resampled mono float32 audio. Every extractor
+# loads through load_audio(), so a file is decoded and resampled once per
+# target rate and later runs just memory-map the stored array.
+CACHE_DIR = os.environ.get("AUDIO_CACHE_DIR", os.path.expanduser("~/.cache/music_research/decoded_audio"))
+CACHE_MAX_BYTES = int(float(os.environ.get("AUDIO_CACHE_MAX_GB", "50")) * 1024 ** 3)
+CACHE_ENABLED = os.environ.get("AUDIO_CACHE_DISABLED", "") == ""
+
+# Content hashes of files already seen by this process, keyed by (path, size, mtime)
+_hash_memo = {}
+
+
+def source_hash(file_path):
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime)
+    if memo_key not in _hash_memo:
+        _hash_memo[memo_key] = file_content_hash(file_path)
+    return _hash_memo[memo_key]
+
+
+def _entry_paths(content_hash, sr, cache_dir):
+    stem = os.path.join(cache_dir, f"{content_hash}_{sr or 'native'}")
+    return stem + ".npy", stem + ".json"
+
+
+def _read_entry(content_hash, sr, cache_dir):
+    data_path, meta_path = _entry_paths(content_hash, sr, cache_dir)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    y = np.load(data_path, mmap_mode="r")
+    os.utime(data_path)  # mark as recently used for LRU eviction
+    return y, meta["sr"]
+
+
+# Write through temp files so concurrent workers never see a partial entry
+def _write_entry(content_hash, sr, cache_dir, y, actual_sr):
+    data_path, meta_path = _entry_paths(content_hash, sr, cache_dir)
+    pid = os.getpid()
+    with open(f"{data_path}.{pid}.tmp", "wb") as f:
+        np.save(f, np.ascontiguousarray(y, dtype=np.float32))
+    with open(f"{meta_path}.{pid}.tmp", "w") as f:
+        json.dump({"sr": actual_sr}, f)
+    os.replace(f"{meta_path}.{pid}.tmp", meta_path)
+    os.replace(f"{data_path}.{pid}.tmp", data_path)
+
+
+# Drop least recently used entries until the cache fits under max_bytes
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    entries = []
+    for data_path in glob.glob(os.path.join(cache_dir, "*.npy")):
+        try:
+            stat = os.stat(data_path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, data_path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, data_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        for path in (data_path, data_path[:-len(".npy")] + ".json"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= size
+
+
+# Drop-in replacement for librosa.load(file_path, sr=sr) (mono). Returns a
+# read-only memory-mapped array on a cache hit. A miss at a target rate
+# reuses the cached native-rate decode when there is one, so only the
+# resampling step runs.
+def load_audio(file_path, sr=22050, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    if not CACHE_ENABLED:
+        return librosa.load(file_path, sr=sr)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    content_hash = source_hash(file_path)
+    cached = _read_entry(content_hash, sr, cache_dir)
+    if cached is not None:
+        return cached
+
+    native = _read_entry(content_hash, None, cache_dir) if sr is not None else None
+    if native is not None:
+        y = librosa.resample(np.asarray(native[0]), orig_sr=native[1], target_sr=sr)
+        actual_sr = sr
+    else:
+        y, actual_sr = librosa.load(file_path, sr=sr)
+
+    _write_entry(content_hash, sr, cache_dir, y, actual_sr)
+    evict(cache_dir, max_bytes)
+    return y, actual_sr
@@ -0,0 +1,31 @@
+import os
+import soundfile as sf
+
+# Listing and sizing the audio files of a corpus directory, shared by the
+# batch extractors
+AUDIO_EXTENSIONS = ('.m4a', '.wav', '.mp3', '.flac')
+ESTIMATED_BYTES_PER_SECOND = 16000  # ~128 kbps, used when the header can't be read
+
+
+def list_audio_files(directory):
+    return [
+        os.path.join(directory, filename)
+        for filename in sorted(os.listdir(directory))
+        if filename.endswith(AUDIO_EXTENSIONS)
+    ]
+
+
+# Read the duration from the file header without decoding; fall back to a
+# size-based estimate for containers soundfile can't open (e.g. .m4a)
+def estimate_duration(file_path):
+    try:
+        return sf.info(file_path).duration
+    except Exception:
+        return os.path.getsize(file_path) / ESTIMATED_BYTES_PER_SECOND
+
+
+# Longest files first, so one long broadcast doesn't end up running alone at
+# the end of a parallel batch
+def longest_first(file_paths):
+    durations = {path: estimate_duration(path) for path in file_paths}
+    return sorted(file_paths, key=lambda path: durations[path], reverse=True)
@@ -2,8 +2,24 @@ import librosa
 import numpy as np
 import pandas as pd
 import os
-import csv
-from scipy.stats import entropy
+import argparse
+import functools
+from analysis_context import AudioAnalysisContext, DEFAULT_SR, RHYTHM_SR
+from pitch_classes import INVALID_MIDI, frames_at_interval, to_pitch_classes, pitch_class_stats
+from beat_sync import beat_pitch_classes, beats_on_grid
+from rhythm_variability import RHYTHM_VARIABILITY_COLUMNS, rhythm_variability
+from streaming_analysis import streamed_context
+from audio_cache import load_audio
+from music_screening import SCREENING_COLUMNS, screen_music
+from excerpt_sampling import EXCERPT_COUNT, EXCERPT_SECONDS, EXCERPT_SAMPLING
+from excerpt_sampling import audio_duration, excerpt_offsets, read_excerpt, summarize_excerpts
+from pitch_timeline import WINDOW_SECONDS as TIMELINE_WINDOW_SECONDS, HOP_SECONDS as TIMELINE_HOP_SECONDS
+from pitch_timeline import pitch_timeline, write_timeline
+from stage_trace import enable_tracing, stage, traced_file
+from feature_registry import FeatureRegistry, flatten_features
+from extraction_manifest import ExtractionManifest, check_columns, checkpoint_row, merge_checkpointed_rows
+from supervised_workers import Quarantine, run_supervised
+from audio_files import list_audio_files, longest_first
 
 # Define the directory containing the audio files
 directory = '/Users/leomckenna/Desktop/Music Research/wav_files_control'
@@ -11,80 +27,374 @@ directory = '/Users/leomckenna/Desktop/Music Research/wav_files_control'
 # Define the output CSV filep
 output_csv = '/Users/leomckenna/Desktop/Music Research/audio_metrics_control.csv'
 
-# Initialize a list to store the metrics for each file
-audio_data = []
-
-for filename in os.listdir(directory):
-    if filename.endswith(('.m4a', '.wav', '.mp3', '.flac')):
-        file_path = os.path.join(directory, filename)
-        y, sr = librosa.load(file_path)
-
-        # TEMPO AND RHYTHM METRICS
-        tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
-        tempo = tempo.item() if isinstance(tempo, np.ndarray) else tempo
-
-        # Estimate an alternative tempo using predominant local pulse (PLP)
-        plp = librosa.beat.plp(y=y, sr=sr)
-        plp_beats = np.where(plp > 0.5)[0]  # Extract strong pulses
-        if len(plp_beats) > 1:
-            inter_beat_intervals = np.diff(librosa.frames_to_time(plp_beats, sr=sr))
-            estimated_tempo_plp = 60 / np.median(inter_beat_intervals)
-        else:
-            estimated_tempo_plp = tempo  # Fallback if no strong PLP estimate
-
-        # Use the closer of the two estimates (account for possible octave errors)
-        if abs(estimated_tempo_plp - 2 * tempo) < abs(estimated_tempo_plp - tempo):
-            tempo = tempo * 2
-        elif abs(estimated_tempo_plp - 0.5 * tempo) < abs(estimated_tempo_plp - tempo):
-            tempo = tempo / 2
-        else:
-            tempo = tempo  # Keep original if no octave issue detected
-
-        beat_times = librosa.frames_to_time(beat_frames, sr=sr)
-        onset_frames = librosa.onset.onset_detect(y=y, sr=sr)
-        onset_times = librosa.frames_to_time(onset_frames, sr=sr)
-        total_duration = librosa.get_duration(y=y, sr=sr)
-        clock_density = len(onset_times) / total_duration
-        beat_density = len(beat_times) / total_duration
-        onsets_per_beat = len(onset_times) / len(beat_times) if len(beat_times) > 0 else np.nan
-
-        # PITCH METRICS
-        D = librosa.stft(y)
-        frequencies = librosa.fft_frequencies(sr=sr)
-        magnitude = np.abs(D)
-        dominant_freq_indices = np.argmax(magnitude, axis=0)
-        dominant_frequencies = frequencies[dominant_freq_indices]
-        dominant_frequencies[dominant_frequencies == 0] = np.nan
-        frame_times = librosa.frames_to_time(np.arange(len(dominant_frequencies)), sr=sr)
-        interval = tempo / 60
-        selected_times = np.arange(0, frame_times[-1], interval) if len(frame_times) > 0 else []
-        selected_indices = np.searchsorted(frame_times, selected_times) if len(frame_times) > 0 else []
-        dominant_notes = [librosa.hz_to_note(freq) if not np.isnan(freq) else "Invalid" for freq in dominant_frequencies]
-        selected_notes = [dominant_notes[idx] for idx in selected_indices if dominant_notes[idx] != "Invalid"]
-        valid_midi = [librosa.note_to_midi(note) % 12 for note in selected_notes]
-        pitch_sd = np.std(valid_midi)
-        pitch_mean = np.mean(valid_midi)
-        pitch_median = np.median(valid_midi)
-        unique_midi, counts = np.unique(valid_midi, return_counts=True)
-        probabilities = counts / counts.sum()
-        pitch_entropy = entropy(probabilities, base=2)
-        midi_series = pd.Series(valid_midi)
-        pitch_intervals = midi_series.diff().dropna()
-        intervallic_variability = np.std(pitch_intervals)
-
-        # Store metrics
-        audio_data.append([
-            filename, tempo, clock_density, beat_density, onsets_per_beat,
-            pitch_sd, pitch_mean, pitch_median, pitch_entropy, intervallic_variability
-        ])
-
-# Write the metrics to a CSV file
-with open(output_csv, mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow([
-        'Filename', 'Tempo (BPM)', 'Clock Density (Onsets/Sec)', 'Beat Density (Beats/Sec)', 'Onsets per Beat',
-        'Pitch SD', 'Pitch Mean', 'Pitch Median', 'Pitch Entropy', 'Intervallic Variability'
-    ])
-    writer.writerows(audio_data)
-
-print(f'Audio metrics have been saved to {output_csv}')
+# Bump whenever a change alters the metric values so resumed runs recompute
+EXTRACTOR_VERSION = "5"
+
+# Batch mode settings
+MAX_WORKERS = os.cpu_count() or 1
+WORKER_TIMEOUT_S = 30 * 60  # per file; a file that takes longer is quarantined
+
+# Output columns of every metric group, in CSV order
+FEATURE_COLUMNS = {
+    'rhythm': ['Tempo (BPM)', 'Clock Density (Onsets/Sec)', 'Beat Density (Beats/Sec)', 'Onsets per Beat'],
+    'pitch': ['Pitch SD', 'Pitch Mean', 'Pitch Median', 'Pitch Entropy', 'Intervallic Variability'],
+    'pitch_interval': ['Pitch SD', 'Pitch Mean', 'Pitch Median', 'Pitch Entropy', 'Intervallic Variability'],
+    'rhythm_variability': RHYTHM_VARIABILITY_COLUMNS,
+}
+
+# 'pitch_interval' is the earlier fixed-interval pitch sampling; it writes the
+# same columns as 'pitch', so only one of the two can be selected per run
+DEFAULT_FEATURES = ['rhythm', 'pitch', 'rhythm_variability']
+
+
+def metric_columns(features=None):
+    features = DEFAULT_FEATURES if features is None else features
+    return ['Filename'] + [column for name in FEATURE_COLUMNS if name in features for column in FEATURE_COLUMNS[name]]
+
+
+METRIC_COLUMNS = metric_columns()
+
+
+# TEMPO AND RHYTHM METRICS
+def tempo_metrics(ctx):
+    tempo = ctx.tempo
+
+    # Estimate an alternative tempo using predominant local pulse (PLP)
+    plp_beats = np.where(ctx.plp > 0.5)[0]  # Extract strong pulses
+    if len(plp_beats) > 1:
+        inter_beat_intervals = np.diff(librosa.frames_to_time(plp_beats, sr=ctx.sr, hop_length=ctx.hop_length))
+        estimated_tempo_plp = 60 / np.median(inter_beat_intervals)
+    else:
+        estimated_tempo_plp = tempo  # Fallback if no strong PLP estimate
+
+    # Use the closer of the two estimates (account for possible octave errors)
+    if abs(estimated_tempo_plp - 2 * tempo) < abs(estimated_tempo_plp - tempo):
+        tempo = tempo * 2
+    elif abs(estimated_tempo_plp - 0.5 * tempo) < abs(estimated_tempo_plp - tempo):
+        tempo = tempo / 2
+    else:
+        tempo = tempo  # Keep original if no octave issue detected
+
+    beat_times = librosa.frames_to_time(ctx.beat_frames, sr=ctx.sr, hop_length=ctx.hop_length)
+    onset_times = ctx.onset_times
+    total_duration = ctx.duration
+    clock_density = len(onset_times) / total_duration
+    beat_density = len(beat_times) / total_duration
+    onsets_per_beat = len(onset_times) / len(beat_times) if len(beat_times) > 0 else np.nan
+    return tempo, clock_density, beat_density, onsets_per_beat
+
+
+# PITCH METRICS
+# Dominant bin -> MIDI -> pitch class stays in numpy arrays end to end. The
+# pitch class of each beat is the most frequent one among its frames; beats
+# come from the rhythm-rate analysis.
+def pitch_metrics(ctx):
+    pitch_classes = beat_pitch_classes(ctx.dominant_midi, beats_on_grid(ctx.at_rate(RHYTHM_SR), ctx))
+    return pitch_class_stats(pitch_classes[pitch_classes != INVALID_MIDI])
+
+
+# Earlier sampling: the single frame at every multiple of tempo / 60 seconds
+def interval_pitch_metrics(ctx, tempo):
+    interval = tempo / 60
+    selected_indices = frames_at_interval(ctx.frame_times, interval)
+    valid_midi = to_pitch_classes(ctx.dominant_midi[selected_indices])
+    return pitch_class_stats(valid_midi)
+
+
+# Metric groups and the analysis intermediates each one needs; a run only
+# computes the groups it asks for (and what they depend on). Onset and beat
+# based groups run at RHYTHM_SR, half the rate of the pitch analysis.
+AUDIO_METRICS = FeatureRegistry()
+
+
+@AUDIO_METRICS.register('rhythm', needs=['tempo', 'beat_frames', 'plp', 'onset_times', 'duration'], sr=RHYTHM_SR)
+def rhythm_feature(ctx, _):
+    return dict(zip(FEATURE_COLUMNS['rhythm'], tempo_metrics(ctx)))
+
+
+@AUDIO_METRICS.register('pitch', needs=[('beat_frames', RHYTHM_SR), 'dominant_midi'])
+def pitch_feature(ctx, _):
+    return dict(zip(FEATURE_COLUMNS['pitch'], pitch_metrics(ctx)))
+
+
+# Interval sampling follows the octave-corrected tempo, so it needs the rhythm group
+@AUDIO_METRICS.register('pitch_interval', needs=['rhythm', 'dominant_midi', 'frame_times'])
+def pitch_interval_feature(ctx, values):
+    return dict(zip(FEATURE_COLUMNS['pitch_interval'],
+                    interval_pitch_metrics(ctx, values['rhythm']['Tempo (BPM)'])))
+
+
+# nPVI and related variability of the inter-onset intervals
+@AUDIO_METRICS.register('rhythm_variability', needs=['onset_times'], sr=RHYTHM_SR)
+def rhythm_variability_feature(ctx, _):
+    return dict(zip(FEATURE_COLUMNS['rhythm_variability'], rhythm_variability(ctx.onset_times)))
+
+
+AUDIO_METRICS.check()
+
+
+# Assemble one metric_columns(features) row from an analysis context
+# With a timeline_dir the sliding-window pitch timeline (see pitch_timeline.py)
+# is written there as well.
+def metrics_row(file_path, ctx, features=None, timeline_dir=None,
+                window_seconds=TIMELINE_WINDOW_SECONDS, hop_seconds=TIMELINE_HOP_SECONDS):
+    values = AUDIO_METRICS.compute(ctx, DEFAULT_FEATURES if features is None else features)
+    if timeline_dir:
+        with stage("pitch_timeline"):
+            write_timeline(timeline_dir, os.path.basename(file_path),
+                           pitch_timeline(ctx.dominant_midi, ctx.sr, window_seconds=window_seconds,
+                                          hop_seconds=hop_seconds))
+    return [os.path.basename(file_path), *flatten_features(values).values()]
+
+
+# Compute one METRIC_COLUMNS row for a single audio file. With screen=True
+# only the music regions are analysed (see music_screening.py) and the row
+# ends with the SCREENING_COLUMNS report. Every region is analysed on its own,
+# so no beat or onset spans two regions, and each metric is the
+# duration-weighted mean over the regions: densities are then per second of
+# music ('Music Seconds'), not per second of file. Files with too little
+# music get NaN metrics. A pitch timeline needs file time, so it can't be
+# combined with screening.
+def compute_audio_metrics(file_path, features=None, screen=False, **timeline):
+    with traced_file(file_path):
+        if not screen:
+            return metrics_row(file_path, AudioAnalysisContext(file_path), features, **timeline)
+        if timeline.get("timeline_dir"):
+            raise ValueError("A pitch timeline can't be written for screened audio")
+
+        with stage("screening"):
+            y, sr = load_audio(file_path, sr=DEFAULT_SR)
+            regions, report = screen_music(y, sr)
+        n_metrics = len(metric_columns(features)) - 1
+        rows = [metrics_row(file_path, AudioAnalysisContext(file_path, y=y[start:end], sr=sr), features)[1:]
+                for start, end in regions]
+        weights = [end - start for start, end in regions]
+        values = region_mean(rows, weights) if rows else [np.nan] * n_metrics
+        return [os.path.basename(file_path), *values, *report.values()]
+
+
+# Weighted mean of every column of the per-region rows, ignoring NaNs
+def region_mean(rows, weights):
+    rows = np.asarray(rows, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)[:, None] * ~np.isnan(rows)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (np.nansum(rows * weights, axis=0) / weights.sum(axis=0)).tolist()
+
+
+# Same metrics, decoding and analysing the file block-by-block so peak
+# memory doesn't grow with the length of the recording
+def stream_audio_metrics(file_path, features=None, **timeline):
+    with traced_file(file_path):
+        with stage("streaming_analysis"):
+            ctx = streamed_context(file_path)
+        return metrics_row(file_path, ctx, features, **timeline)
+
+
+# Excerpt-mode columns: every metric followed by its SD and 95% confidence
+# half-width across the excerpts
+def excerpt_columns(features=None):
+    metrics = metric_columns(features)[1:]
+    return ['Filename', 'Excerpts', 'Seconds Analysed'] + [
+        column for metric in metrics for column in (metric, f"{metric} SD", f"{metric} CI95")
+    ]
+
+
+# Metrics of N excerpts read straight from disk (see excerpt_sampling.py),
+# summarized as one excerpt_columns(features) row
+def excerpt_audio_metrics(file_path, features=None, n_excerpts=EXCERPT_COUNT,
+                          excerpt_seconds=EXCERPT_SECONDS, sampling="even"):
+    with traced_file(file_path):
+        offsets, seconds = excerpt_offsets(audio_duration(file_path), n_excerpts, excerpt_seconds,
+                                           sampling, seed_key=os.path.basename(file_path))
+        values = []
+        analysed = 0.0
+        for offset in offsets:
+            with stage("load_excerpt"):
+                y = read_excerpt(file_path, offset, seconds, DEFAULT_SR)
+            ctx = AudioAnalysisContext(file_path, y=y, sr=DEFAULT_SR)
+            values.append(metrics_row(file_path, ctx, features)[1:])
+            analysed += len(y) / DEFAULT_SR
+        mean, sd, half_width = summarize_excerpts(values)
+        return [os.path.basename(file_path), len(values), analysed,
+                *np.column_stack((mean, sd, half_width)).ravel().tolist()]
+
+
+# Fan files out over supervised worker processes (see supervised_workers.py),
+# longest first so one long broadcast doesn't end up running alone at the
+# end. Each file gets its own process with a wall-clock timeout and an
+# optional memory ceiling; files that fail, crash or time out are reported
+# and returned instead of stopping the batch. Rows come back sorted by
+# filename. on_row(path, row) is called as each file finishes, for
+# checkpointing, and on_failure(path, reason) for every failed file.
+def run_batch(file_paths, max_workers=MAX_WORKERS, on_row=None, compute=compute_audio_metrics,
+              timeout=WORKER_TIMEOUT_S, memory_limit_mb=None, on_failure=None):
+    schedule = longest_first(file_paths)
+    rows = []
+
+    def collect(path, row):
+        rows.append(row)
+        if on_row:
+            on_row(path, row)
+
+    failures = run_supervised(schedule, compute, max_workers=max_workers, timeout=timeout,
+                              memory_limit_mb=memory_limit_mb, on_row=collect, on_failure=on_failure)
+    rows.sort(key=lambda row: row[0])
+    return rows, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute tempo and pitch metrics for a directory of audio files.")
+    parser.add_argument("--directory", default=directory)
+    parser.add_argument("--output", default=output_csv)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of files analysed in parallel")
+    parser.add_argument("--timeout", type=float, default=WORKER_TIMEOUT_S,
+                        help="Wall-clock limit per file in seconds (0 disables it)")
+    parser.add_argument("--memory-limit", type=float, default=None,
+                        help="Memory ceiling per worker process in MB (resident memory is polled and the "
+                             "worker killed past it; also set as RLIMIT_AS where the OS supports it)")
+    parser.add_argument("--quarantine", default=None,
+                        help="Files that failed, crashed or timed out, with the reason "
+                             "(defaults to <output>.quarantine.json); they are skipped on later runs")
+    parser.add_argument("--retry-quarantined", action="store_true",
+                        help="Try quarantined files again")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Analyse block-by-block with bounded memory (for long recordings)")
+    parser.add_argument("--manifest", default=None,
+                        help="Resume manifest (defaults to <output>.manifest.json)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Discard previous results and recompute every file")
+    parser.add_argument("--features", nargs="+", default=None, choices=AUDIO_METRICS.names,
+                        help=f"Metric groups to compute (default: {' '.join(DEFAULT_FEATURES)})")
+    parser.add_argument("--pitch-sampling", choices=["beat", "interval"], default="beat",
+                        help="Pitch metrics from one pitch class per beat, or from single frames "
+                             "every tempo / 60 seconds (the earlier sampling)")
+    parser.add_argument("--screen", action="store_true",
+                        help="Skip silence, speech and applause before analysis and report the skipped seconds "
+                             "(music regions are analysed separately; densities are per second of music)")
+    parser.add_argument("--excerpts", type=int, default=None,
+                        help=f"Analyse only this many excerpts per file (e.g. {EXCERPT_COUNT}) and report "
+                             "their mean, SD and 95%% confidence half-width")
+    parser.add_argument("--excerpt-seconds", type=float, default=EXCERPT_SECONDS,
+                        help="Length of each excerpt in seconds")
+    parser.add_argument("--excerpt-sampling", choices=EXCERPT_SAMPLING, default="even",
+                        help="Evenly spaced or (reproducibly) random excerpt positions")
+    parser.add_argument("--timeline", default=None,
+                        help="Also write sliding-window pitch-class histograms, entropy and keys "
+                             "per file to this directory (see pitch_timeline.py)")
+    parser.add_argument("--window", type=float, default=TIMELINE_WINDOW_SECONDS,
+                        help="Timeline window length in seconds")
+    parser.add_argument("--hop", type=float, default=TIMELINE_HOP_SECONDS,
+                        help="Timeline hop in seconds")
+    parser.add_argument("--trace", default=None,
+                        help="Append per-file, per-stage timings to this JSON-lines file "
+                             "(summarize with stage_trace.py)")
+    parser.add_argument("--feature-store", default=None,
+                        help="Also append this run's rows to the columnar feature store at this path")
+    parser.add_argument("--corpus", default=None,
+                        help="Corpus partition for the feature store, e.g. 'control' or 'bebop' "
+                             "(required with --feature-store; readers select corpora by this name)")
+    args = parser.parse_args()
+    directory, output_csv = args.directory, args.output
+    features = args.features
+    if args.pitch_sampling == "interval":
+        features = ['pitch_interval' if name == 'pitch' else name for name in features or DEFAULT_FEATURES]
+    if features and 'pitch' in features and 'pitch_interval' in features:
+        parser.error("'pitch' and 'pitch_interval' write the same columns; select only one")
+    if args.excerpts and (args.streaming or args.timeline):
+        parser.error("--excerpts can't be combined with --streaming or --timeline")
+    if args.feature_store and not args.corpus:
+        parser.error("--feature-store needs an explicit --corpus")
+    if args.screen and (args.streaming or args.excerpts or args.timeline):
+        parser.error("--screen can't be combined with --streaming, --excerpts or --timeline")
+    manifest_path = args.manifest or output_csv + ".manifest.json"
+    quarantine_path = args.quarantine or output_csv + ".quarantine.json"
+
+    if args.trace:
+        enable_tracing(args.trace)
+
+    if args.fresh:
+        for path in (output_csv, manifest_path, quarantine_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # Only new or changed files are extracted; each row is checkpointed to the
+    # output CSV as soon as it finishes
+    manifest_version = EXTRACTOR_VERSION
+    if features is not None:
+        manifest_version += ":" + ",".join(sorted(features))
+    if args.timeline:
+        manifest_version += f":timeline={args.window:g}/{args.hop:g}"
+    if args.streaming:
+        manifest_version += ":streaming"
+    if args.screen:
+        manifest_version += ":screened=regions"
+    if args.excerpts:
+        manifest_version += f":excerpts={args.excerpts}x{args.excerpt_seconds:g}/{args.excerpt_sampling}"
+    manifest = ExtractionManifest(manifest_path, manifest_version)
+    columns = excerpt_columns(features) if args.excerpts else metric_columns(features)
+    if args.screen:
+        columns += SCREENING_COLUMNS
+    try:
+        check_columns(output_csv, columns)
+    except ValueError as e:
+        parser.error(f"{e} (--fresh discards it)")
+    file_paths = list_audio_files(directory)
+    pending = manifest.pending(file_paths)
+    quarantine = Quarantine(quarantine_path)
+    if not args.retry_quarantined:
+        skipped = [path for path in pending if manifest.content_hash(path) in quarantine]
+        pending = [path for path in pending if path not in skipped]
+        if skipped:
+            print(f"🚧 {len(skipped)} quarantined file(s) skipped (see {quarantine_path})")
+    print(f"🔁 {len(file_paths) - len(pending)} file(s) already up to date, {len(pending)} to process")
+
+    if args.excerpts:
+        compute = functools.partial(excerpt_audio_metrics, features=features, n_excerpts=args.excerpts,
+                                    excerpt_seconds=args.excerpt_seconds, sampling=args.excerpt_sampling)
+    else:
+        compute = functools.partial(stream_audio_metrics if args.streaming else compute_audio_metrics,
+                                    features=features, timeline_dir=args.timeline,
+                                    window_seconds=args.window, hop_seconds=args.hop)
+        if args.screen:
+            compute = functools.partial(compute, screen=True)
+    new_rows = []
+
+    def checkpoint(file_path, row):
+        checkpoint_row(output_csv, columns, row)
+        manifest.mark_done(file_path)
+        quarantine.remove(manifest.content_hash(file_path))
+        new_rows.append(row)
+
+    def quarantine_file(file_path, reason):
+        quarantine.add(manifest.content_hash(file_path), file_path, reason)
+
+    # Every file runs in its own supervised process, so a corrupt or hanging
+    # file is quarantined instead of stopping the run
+    _, failures = run_batch(pending, max_workers=args.workers, on_row=checkpoint, compute=compute,
+                            timeout=args.timeout or None, memory_limit_mb=args.memory_limit,
+                            on_failure=quarantine_file)
+    if failures:
+        print(f"⚠️ {len(failures)} file(s) failed and were quarantined in {quarantine_path}:")
+        for path, error in failures:
+            print(f"  {path}: {error}")
+
+    # Merge new rows with the results of earlier runs
+    merge_checkpointed_rows(output_csv, 'Filename')
+
+    if args.feature_store:
+        from feature_store import append_features, new_run_id, run_mode
+        # Rows land in a partition per way of computing them, so loaders never mix modes
+        selection = None if features is None or sorted(features) == sorted(DEFAULT_FEATURES) else features
+        mode = run_mode(
+            selection and "features+" + "+".join(sorted(selection)),
+            args.streaming and "streaming",
+            args.screen and "screened",
+            args.excerpts and f"excerpts{args.excerpts}x{args.excerpt_seconds:g}{args.excerpt_sampling}",
+        )
+        part = append_features(args.feature_store, pd.DataFrame(new_rows, columns=columns),
+                               args.corpus, EXTRACTOR_VERSION, new_run_id(), mode=mode)
+        if part:
+            print(f"🗄️ {len(new_rows)} row(s) appended to the feature store: {part}")
+
+    print(f'Audio metrics have been saved to {output_csv}')
@@ -0,0 +1,52 @@
+import librosa
+import numpy as np
+from pitch_classes import INVALID_MIDI
+
+# Beat-synchronous reduction of frame-level features. The frames of a file
+# are cut at its beat frames into segments [0, b_1), [b_1, b_2), ...,
+# [b_n, n_frames) and every segment is reduced to one value, giving one
+# column per beat instead of one per STFT frame. Continuous features (chroma,
+# RMS, MFCC) go through librosa.util.sync, which uses the same segments;
+# categorical ones (dominant MIDI, pitch class) take the most frequent valid
+# value of the segment, counted for all segments at once with a single
+# bincount.
+
+
+# Segment start frames: 0 plus the beat frames, clipped, sorted and unique
+def segment_starts(beat_frames, n_frames):
+    beat_frames = np.asarray(beat_frames, dtype=np.int64)
+    beat_frames = beat_frames[(beat_frames > 0) & (beat_frames < n_frames)]
+    return np.unique(np.concatenate(([0], beat_frames))) if n_frames > 0 else np.empty(0, dtype=np.int64)
+
+
+# Beat frames of `rhythm_ctx` (usually ctx.at_rate(RHYTHM_SR)) on the frame
+# grid of `ctx`, whose sample rate and hop length may differ
+def beats_on_grid(rhythm_ctx, ctx):
+    beat_times = librosa.frames_to_time(rhythm_ctx.beat_frames, sr=rhythm_ctx.sr, hop_length=rhythm_ctx.hop_length)
+    return librosa.time_to_frames(beat_times, sr=ctx.sr, hop_length=ctx.hop_length)
+
+
+# Most frequent valid value of every segment for integer labels in
+# [0, n_values) (widened if larger labels occur); `invalid` marks frames to ignore and segments without any
+# valid frame. Ties go to the smallest value.
+def beat_mode(labels, beat_frames, n_values, invalid=INVALID_MIDI):
+    labels = np.asarray(labels, dtype=np.int64)
+    n_values = max(n_values, int(labels.max(initial=-1)) + 1)
+    starts = segment_starts(beat_frames, len(labels))
+    segments = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(labels))))
+    valid = labels != invalid
+    counts = np.bincount(segments[valid] * n_values + labels[valid],
+                         minlength=len(starts) * n_values).reshape(len(starts), n_values)
+    return np.where(counts.max(axis=1, initial=0) > 0, counts.argmax(axis=1), invalid)
+
+
+# Frame time of every segment start
+def segment_times(beat_frames, n_frames, frame_times):
+    return np.asarray(frame_times)[segment_starts(beat_frames, n_frames)]
+
+
+# Dominant pitch class of every beat (INVALID_MIDI where no frame had one)
+def beat_pitch_classes(midi, beat_frames):
+    midi = np.asarray(midi)
+    pitch_classes = np.where(midi != INVALID_MIDI, midi % 12, INVALID_MIDI)
+    return beat_mode(pitch_classes, beat_frames, 12)
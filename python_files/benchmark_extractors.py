@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+import librosa
+import numpy as np
+import soundfile as sf
+from analysis_context import AudioAnalysisContext, DEFAULT_SR, RHYTHM_SR
+from audio_metrics import tempo_metrics, pitch_metrics
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "librosa_files"))
+from librosa_work import LIBROSA_FEATURES
+
+# Benchmark the feature extractors on deterministic synthetic audio. Every
+# stage is timed separately and reported as seconds of audio processed per
+# CPU-second, so runs on different machines and durations stay comparable.
+
+DEFAULT_DURATIONS = [10, 60]
+DEFAULT_FILE_RATES = [22050, 44100]
+DEFAULT_TEMPI = [120, 240]
+REGRESSION_TOLERANCE = 0.10  # flag stages more than 10% slower than the baseline
+MEMORY_TOLERANCE = 0.10  # flag cases whose peak RSS grew by more than 10%
+
+
+# Click track: 20 ms decaying noise bursts on every beat
+def click_track(tempo, duration, sr, seed=0):
+    rng = np.random.default_rng(seed)
+    y = np.zeros(int(duration * sr), dtype=np.float32)
+    click_len = int(0.02 * sr)
+    click = rng.standard_normal(click_len).astype(np.float32) * np.exp(-np.linspace(0, 8, click_len))
+    for start in (np.arange(0, duration, 60.0 / tempo) * sr).astype(int):
+        end = min(start + click_len, len(y))
+        y[start:end] += click[:end - start]
+    return 0.5 * y / np.abs(y).max()
+
+
+# Sequence of sine tones cycling through the given pitch classes (octave 4)
+def tone_sequence(pitch_classes, note_duration, duration, sr):
+    t = np.arange(int(duration * sr)) / sr
+    note_index = (t // note_duration).astype(int) % len(pitch_classes)
+    frequencies = librosa.midi_to_hz(60 + np.asarray(pitch_classes))[note_index]
+    phase = 2 * np.pi * np.cumsum(frequencies) / sr
+    return (0.3 * np.sin(phase)).astype(np.float32)
+
+
+# Deterministic benchmark corpus: (name, signal, file sample rate, duration)
+def synthetic_cases(durations=DEFAULT_DURATIONS, file_rates=DEFAULT_FILE_RATES, tempi=DEFAULT_TEMPI):
+    for duration in durations:
+        for sr in file_rates:
+            for tempo in tempi:
+                yield f"clicks_{tempo}bpm_{duration}s_{sr}hz", click_track(tempo, duration, sr), sr, duration
+            scale = [0, 2, 4, 5, 7, 9, 11]
+            yield f"tones_{duration}s_{sr}hz", tone_sequence(scale, 0.25, duration, sr), sr, duration
+
+
+# High-water mark of this process; run_benchmarks gives every case its own
+# process so this is the case's peak (plus the fixed cost of the imports)
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+def timed(fn):
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    result = fn()
+    return result, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+# Time every stage of both extractors on one synthetic file
+def benchmark_case(file_path, duration, include_librosa_features=True):
+    stages = {}
+
+    def record(stage, fn):
+        result, wall, cpu = timed(fn)
+        stages[stage] = {
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "audio_s_per_cpu_s": duration / cpu if cpu > 0 else float("inf"),
+        }
+        return result
+
+    # audio_metrics.py stages, in dependency order so each one only pays for itself
+    y, sr = record("load", lambda: librosa.load(file_path, sr=DEFAULT_SR))
+    ctx = AudioAnalysisContext(file_path, y=y, sr=sr)
+    record("stft", lambda: ctx.stft_magnitude)
+    rhythm = record("resample_rhythm", lambda: ctx.at_rate(RHYTHM_SR))
+    record("rhythm_stft", lambda: rhythm.stft_magnitude)
+    record("mel_spectrogram", lambda: rhythm.mel_spectrogram)
+    record("onset_envelope", lambda: rhythm.onset_envelope)
+    record("beat_track", lambda: rhythm.beat_frames)
+    record("plp", lambda: rhythm.plp)
+    record("onset_detect", lambda: rhythm.onset_frames)
+    record("tempo_metrics", lambda: tempo_metrics(rhythm))
+    record("pitch_metrics", lambda: pitch_metrics(ctx))
+
+    # librosa_work.py loads at the native rate; its shared intermediates are
+    # timed first so each feature stage only measures the feature itself
+    if include_librosa_features:
+        y_native, sr_native = record("load_native", lambda: librosa.load(file_path, sr=None))
+        native = AudioAnalysisContext(file_path, y=y_native, sr=sr_native)
+        for intermediate in ("stft", "stft_magnitude", "log_mel_spectrogram", "onset_envelope",
+                             "y_harmonic", "cqt_magnitude", "harmonic_cqt_magnitude"):
+            record(f"native:{intermediate}", lambda: getattr(native, intermediate))
+        for name, feature in LIBROSA_FEATURES.features.items():
+            record(f"feature:{name}", lambda: feature.compute(native.at_rate(feature.sr), {}))
+
+    return {"duration_s": duration, "peak_rss_mb": peak_rss_mb(), "stages": stages}
+
+
+def run_benchmarks(durations=DEFAULT_DURATIONS, file_rates=DEFAULT_FILE_RATES, include_librosa_features=True):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, y, sr, duration in synthetic_cases(durations, file_rates):
+            file_path = os.path.join(tmp_dir, f"{name}.wav")
+            sf.write(file_path, y, sr, subtype="FLOAT")
+            print(f"⏱️ {name}")
+            # A fresh (spawned, not forked) process per case, since ru_maxrss
+            # never goes down within a process
+            with multiprocessing.get_context("spawn").Pool(processes=1) as pool:
+                results[name] = pool.apply(benchmark_case, (file_path, duration, include_librosa_features))
+    return results
+
+
+def print_report(results):
+    print(f"\n{'case':<32} {'stage':<28} {'wall (s)':>10} {'cpu (s)':>10} {'audio s/cpu s':>14}")
+    for case, result in results.items():
+        for stage, timing in result["stages"].items():
+            print(f"{case:<32} {stage:<28} {timing['wall_s']:>10.3f} {timing['cpu_s']:>10.3f} "
+                  f"{timing['audio_s_per_cpu_s']:>14.1f}")
+        print(f"{case:<32} {'peak RSS (MB)':<28} {result['peak_rss_mb']:>10.1f}")
+
+
+# Compare throughput and peak RSS against a saved baseline; returns the
+# regressions as (case, stage or "peak_rss_mb", ratio to the baseline)
+def compare_to_baseline(results, baseline, tolerance=REGRESSION_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    regressions = []
+    print(f"\n{'case':<32} {'stage':<28} {'speedup':>8}")
+    for case, result in results.items():
+        for stage, timing in result["stages"].items():
+            reference = baseline.get(case, {}).get("stages", {}).get(stage)
+            if not reference:
+                continue
+            speedup = timing["audio_s_per_cpu_s"] / reference["audio_s_per_cpu_s"]
+            flag = "  ⚠️ slower" if speedup < 1 - tolerance else ""
+            print(f"{case:<32} {stage:<28} {speedup:>7.2f}x{flag}")
+            if flag:
+                regressions.append((case, stage, speedup))
+
+    print(f"\n{'case':<32} {'peak RSS (MB)':>14} {'baseline':>10} {'ratio':>8}")
+    for case, result in results.items():
+        reference = baseline.get(case, {}).get("peak_rss_mb")
+        if not reference:
+            continue
+        ratio = result["peak_rss_mb"] / reference
+        flag = "  ⚠️ more memory" if ratio > 1 + memory_tolerance else ""
+        print(f"{case:<32} {result['peak_rss_mb']:>14.1f} {reference:>10.1f} {ratio:>7.2f}x{flag}")
+        if flag:
+            regressions.append((case, "peak_rss_mb", ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-stage benchmarks for the audio feature extractors.")
+    parser.add_argument("--durations", type=float, nargs="+", default=DEFAULT_DURATIONS)
+    parser.add_argument("--file-rates", type=int, nargs="+", default=DEFAULT_FILE_RATES)
+    parser.add_argument("--skip-librosa-features", action="store_true",
+                        help="Only benchmark the audio_metrics.py stages")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="Allowed throughput loss per stage (fraction)")
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE,
+                        help="Allowed peak RSS growth per case (fraction)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.durations, args.file_rates, not args.skip_librosa_features)
+    print_report(results)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nBenchmark results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.memory_tolerance)
+        if regressions:
+            sys.exit(f"🚨 {len(regressions)} regression(s) against the baseline "
+                     f"(throughput tolerance {args.tolerance:.0%}, memory tolerance {args.memory_tolerance:.0%})")
@@ -9,15 +9,34 @@ ssd_path = "/Volumes/Extreme SSD/"
 control_file = os.path.join(ssd_path, "audio_metrics.csv")
 bebop_file = os.path.join(ssd_path, "audio_metrics_non_control.csv")
 
-# Verify files exist before reading
-if not os.path.exists(control_file):
-    raise FileNotFoundError(f"Control file not found: {control_file}")
-if not os.path.exists(bebop_file):
-    raise FileNotFoundError(f"Bebop file not found: {bebop_file}")
+# Columnar feature store written by audio_metrics.py --feature-store (preferred when present).
+# The corpus names must match the --corpus each extraction run was given.
+feature_store_dir = os.path.join(ssd_path, "feature_store")
+control_corpus = "control"
+bebop_corpus = "bebop"
 
-# Load CSV files
-control_df = pd.read_csv(control_file)
-bebop_df = pd.read_csv(bebop_file)
+# List of numerical columns to compare
+numerical_columns = [
+    "Tempo (BPM)", "Clock Density (Onsets/Sec)", "Beat Density (Beats/Sec)",
+    "Onsets per Beat", "Pitch SD", "Pitch Mean", "Pitch Median",
+    "Pitch Entropy", "Intervallic Variability"
+]
+
+if os.path.isdir(feature_store_dir):
+    # Typed columns, and only the metrics we plot are read
+    from feature_store import load_features
+    control_df = load_features(feature_store_dir, columns=numerical_columns, corpus=control_corpus)
+    bebop_df = load_features(feature_store_dir, columns=numerical_columns, corpus=bebop_corpus)
+else:
+    # Verify files exist before reading
+    if not os.path.exists(control_file):
+        raise FileNotFoundError(f"Control file not found: {control_file}")
+    if not os.path.exists(bebop_file):
+        raise FileNotFoundError(f"Bebop file not found: {bebop_file}")
+
+    # Load CSV files
+    control_df = pd.read_csv(control_file)
+    bebop_df = pd.read_csv(bebop_file)
 
 # Add a label column to differentiate datasets
 control_df["Dataset"] = "Control"
@@ -33,16 +52,10 @@ bebop_sample = bebop_df.sample(n=min_size, random_state=42)
 # Combine the balanced datasets
 balanced_df = pd.concat([control_sample, bebop_sample])
 
-# List of numerical columns to compare
-numerical_columns = [
-    "Tempo (BPM)", "Clock Density (Onsets/Sec)", "Beat Density (Beats/Sec)",
-    "Onsets per Beat", "Pitch SD", "Pitch Mean", "Pitch Median",
-    "Pitch Entropy", "Intervallic Variability"
-]
-
-# Convert columns to numeric
-for col in numerical_columns:
-    balanced_df[col] = pd.to_numeric(balanced_df[col], errors="coerce")
+# Convert columns to numeric (CSV input only; the feature store is already typed)
+if not os.path.isdir(feature_store_dir):
+    for col in numerical_columns:
+        balanced_df[col] = pd.to_numeric(balanced_df[col], errors="coerce")
 
 # Plot KDE distributions for balanced dataset
 for col in numerical_columns:
@@ -0,0 +1,70 @@
+import zlib
+import warnings
+import librosa
+import numpy as np
+import soundfile as sf
+from scipy import stats
+
+# Excerpt sampling for survey-scale runs: instead of decoding a whole
+# recording, N excerpts of a fixed length are read straight from disk and
+# analysed separately. soundfile seeks to each excerpt so only its frames are
+# decoded; containers it can't open fall back to librosa.load with
+# offset/duration. The per-excerpt metrics are summarized as a mean with its
+# standard deviation and a 95% confidence half-width (Student t), which
+# bounds how far the sampled estimate is likely to be from the mean over
+# all excerpts of the file.
+EXCERPT_COUNT = 5
+EXCERPT_SECONDS = 30.0
+EXCERPT_SAMPLING = ("even", "random")
+CONFIDENCE = 0.95
+
+
+def audio_duration(file_path):
+    try:
+        return sf.info(file_path).duration
+    except Exception:
+        return librosa.get_duration(path=file_path)
+
+
+# Excerpt start times: evenly spaced from the start to the end of the file, or
+# uniformly random (seeded by the filename, so reruns pick the same excerpts).
+# A file no longer than the excerpts combined is read as a single excerpt.
+def excerpt_offsets(duration, n_excerpts=EXCERPT_COUNT, excerpt_seconds=EXCERPT_SECONDS,
+                    sampling="even", seed_key=""):
+    if n_excerpts * excerpt_seconds >= duration:
+        return np.array([0.0]), duration
+    latest_start = duration - excerpt_seconds
+    if sampling == "random":
+        rng = np.random.default_rng(zlib.crc32(seed_key.encode()))
+        return np.sort(rng.uniform(0, latest_start, n_excerpts)), excerpt_seconds
+    return np.linspace(0, latest_start, n_excerpts), excerpt_seconds
+
+
+# Mono float32 excerpt resampled to sr
+def read_excerpt(file_path, offset, seconds, sr):
+    try:
+        with sf.SoundFile(file_path) as f:
+            f.seek(int(offset * f.samplerate))
+            block = f.read(int(round(seconds * f.samplerate)), dtype="float32", always_2d=True)
+            native_sr = f.samplerate
+    except Exception:
+        y, _ = librosa.load(file_path, sr=sr, offset=offset, duration=seconds)
+        return y
+    y = block.mean(axis=1)
+    return librosa.resample(y, orig_sr=native_sr, target_sr=sr) if native_sr != sr else y
+
+
+# Column-wise mean, SD and confidence half-width of a (n_excerpts, n_metrics)
+# matrix, ignoring NaNs. With a single valid excerpt the spread is NaN, and a
+# column without any valid excerpt is NaN throughout (numpy's "Mean of empty
+# slice" warning is silenced so it doesn't flood batch logs).
+def summarize_excerpts(values, confidence=CONFIDENCE):
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.sum(~np.isnan(values), axis=0)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        mean = np.nanmean(values, axis=0)
+        sd = np.sqrt(np.nansum((values - mean) ** 2, axis=0) / (counts - 1))
+        sd = np.where(counts > 1, sd, np.nan)
+        half_width = stats.t.ppf(0.5 + confidence / 2, np.maximum(counts - 1, 1)) * sd / np.sqrt(counts)
+    return mean, sd, half_width
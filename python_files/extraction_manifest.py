@@ -0,0 +1,111 @@
+import os
+import csv
+import json
+import time
+import hashlib
+import pandas as pd
+
+
+# Hash file contents in 1 MB chunks so large WAVs never sit in memory
+def file_content_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Persistent record of which files an extractor has already processed.
+# Entries are keyed by "<extractor version>:<content hash>", so editing or
+# replacing a file, or bumping the extractor version, makes it due again.
+# The (size, mtime) of each path is remembered so unchanged files are not
+# re-hashed on every run.
+class ExtractionManifest:
+    def __init__(self, path, extractor_version):
+        self.path = path
+        self.extractor_version = str(extractor_version)
+        self.entries = {}
+        self.stat_cache = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                try:
+                    data = json.load(f)
+                    self.entries = data.get("entries", {})
+                    self.stat_cache = data.get("stat_cache", {})
+                except json.JSONDecodeError:
+                    print(f"⚠️ Manifest {path} is corrupted. Starting from an empty manifest.")
+
+    def key(self, content_hash):
+        return f"{self.extractor_version}:{content_hash}"
+
+    def content_hash(self, file_path):
+        stat = os.stat(file_path)
+        cached = self.stat_cache.get(file_path)
+        if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime:
+            return cached["hash"]
+        content_hash = file_content_hash(file_path)
+        self.stat_cache[file_path] = {"size": stat.st_size, "mtime": stat.st_mtime, "hash": content_hash}
+        return content_hash
+
+    def is_done(self, file_path):
+        entry = self.entries.get(self.key(self.content_hash(file_path)))
+        return entry is not None and entry["filename"] == os.path.basename(file_path)
+
+    def pending(self, file_paths):
+        return [path for path in file_paths if not self.is_done(path)]
+
+    def mark_done(self, file_path):
+        self.entries[self.key(self.content_hash(file_path))] = {
+            "filename": os.path.basename(file_path),
+            "completed": time.time(),
+        }
+        self.save()
+
+    # Write to a temp file and swap it in so a crash never leaves a half-written manifest
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"entries": self.entries, "stat_cache": self.stat_cache}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+# Header of an existing output CSV, or None when there is nothing to append to
+def existing_columns(path):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, newline="") as file:
+        return next(csv.reader(file), None)
+
+
+# Rows are only ever appended under their own header: an output written with
+# another column layout (different features, modes or extractor version)
+# can't be merged with this run, so refuse instead of misaligning the rows
+def check_columns(path, columns):
+    header = existing_columns(path)
+    if header is not None and header != list(columns):
+        raise ValueError(
+            f"{path} was written with a different column layout "
+            f"({len(header)} columns, this run writes {len(columns)}). "
+            f"Write to another output file, or remove this one to start over."
+        )
+
+
+# Append one finished row to the output CSV, writing the header on first use
+def checkpoint_row(path, columns, row):
+    check_columns(path, columns)
+    write_header = existing_columns(path) is None
+    with open(path, mode="a", newline="") as file:
+        writer = csv.writer(file)
+        if write_header:
+            writer.writerow(columns)
+        writer.writerow(row)
+
+
+# Collapse checkpointed rows into the final table: a file that was re-extracted
+# keeps only its newest row, and rows are sorted by key for a stable diff
+def merge_checkpointed_rows(path, key_column):
+    if not os.path.exists(path):
+        return
+    df = pd.read_csv(path)
+    df = df.drop_duplicates(subset=key_column, keep="last").sort_values(key_column)
+    df.to_csv(path, index=False)
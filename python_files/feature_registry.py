@@ -0,0 +1,136 @@
+import numpy as np
+from analysis_context import INTERMEDIATE_DEPENDENCIES
+from stage_trace import stage
+
+
+# sr is the sample rate the feature is computed at (None: the context's own);
+# see AudioAnalysisContext.at_rate. A need computed at another rate than the
+# feature's own (e.g. beats from the rhythm-rate analysis) is declared as an
+# (intermediate, sr) pair.
+class Feature:
+    def __init__(self, name, compute, needs=(), sr=None):
+        self.name = name
+        self.compute = compute
+        self.needs = tuple(needs)
+        self.sr = sr
+
+
+# Declarative feature registry. Every feature names the analysis-context
+# intermediates (or other features) it needs; a run asks for a list of
+# features and only their dependency closure is ever computed, because the
+# context computes intermediates lazily on first use.
+class FeatureRegistry:
+    def __init__(self, intermediate_dependencies=INTERMEDIATE_DEPENDENCIES):
+        self.features = {}
+        self.intermediate_dependencies = intermediate_dependencies
+
+    # A need names an intermediate when it is one (or is the feature's own
+    # name, e.g. a "duration" feature reading ctx.duration); otherwise it names
+    # another feature. Intermediates win over features of the same name.
+    def _needs_intermediate(self, name, need):
+        return need == name or need in self.intermediate_dependencies
+
+    # compute(ctx, values) gets the context and the already computed
+    # features it depends on
+    def add(self, name, compute, needs=(), sr=None):
+        for need in needs:
+            if isinstance(need, tuple):
+                need, _ = need
+                if need not in self.intermediate_dependencies:
+                    raise ValueError(f"Feature {name!r} needs unknown intermediate {need!r}")
+            elif need not in self.features and need not in self.intermediate_dependencies:
+                raise ValueError(f"Feature {name!r} needs unknown feature or intermediate {need!r}")
+        self.features[name] = Feature(name, compute, needs, sr)
+
+    def register(self, name, needs=(), sr=None):
+        def decorator(compute):
+            self.add(name, compute, needs, sr)
+            return compute
+        return decorator
+
+    @property
+    def names(self):
+        return list(self.features)
+
+    # Features (dependencies first) and intermediates needed for `names`.
+    # Intermediates computed at a declared rate are listed as "<name>@<sr>".
+    def resolve(self, names=None):
+        names = self.names if names is None else list(names)
+        unknown = [name for name in names if name not in self.features]
+        if unknown:
+            raise ValueError(f"Unknown feature(s): {', '.join(unknown)}. Available: {', '.join(self.names)}")
+
+        features, intermediates = [], []
+
+        def visit_intermediate(name, sr):
+            label = name if sr is None else f"{name}@{sr}"
+            if label in intermediates:
+                return
+            for dependency in self.intermediate_dependencies[name]:
+                visit_intermediate(dependency, sr)
+            intermediates.append(label)
+
+        def visit_feature(name):
+            if name in features:
+                return
+            feature = self.features[name]
+            for need in feature.needs:
+                if isinstance(need, tuple):
+                    visit_intermediate(*need)
+                elif self._needs_intermediate(name, need):
+                    visit_intermediate(need, feature.sr)
+                else:
+                    visit_feature(need)
+            features.append(name)
+
+        for name in names:
+            visit_feature(name)
+        return features, intermediates
+
+    # Resolve every feature on its own, so a broken dependency declaration
+    # fails when the registry is built rather than on every file
+    def check(self):
+        for name in self.names:
+            self.resolve([name])
+
+    # Sample rates the requested features run at or read from (None: the context's own)
+    def rates(self, names=None):
+        order, _ = self.resolve(names)
+        rates = set()
+        for name in order:
+            feature = self.features[name]
+            rates.add(feature.sr)
+            rates.update(need[1] for need in feature.needs if isinstance(need, tuple))
+        return sorted(rates, key=lambda sr: (sr is not None, sr))
+
+    # Values of the requested features (registry order), each timed as its own
+    # stage and computed on the context at the feature's declared rate
+    def compute(self, ctx, names=None):
+        requested = self.names if names is None else list(names)
+        order, _ = self.resolve(requested)
+        values = {}
+        for name in order:
+            feature = self.features[name]
+            feature_ctx = ctx.at_rate(feature.sr) if feature.sr else ctx
+            with stage(name):
+                values[name] = feature.compute(feature_ctx, {
+                    need: values[need] for need in feature.needs
+                    if not isinstance(need, tuple) and not self._needs_intermediate(name, need)
+                })
+        return {name: values[name] for name in self.names if name in requested}
+
+
+# Flatten feature values into output columns. Scalars (and the entries of
+# dict-valued features) come first in registry order, then every vector
+# feature expanded into <name>_1..<name>_n, which keeps the column layout of
+# the existing CSVs.
+def flatten_features(values):
+    scalars, vectors = {}, {}
+    for name, value in values.items():
+        if isinstance(value, dict):
+            scalars.update(value)
+        elif isinstance(value, (list, tuple, np.ndarray)):
+            vectors.update({f"{name}_{i + 1}": v for i, v in enumerate(np.ravel(value))})
+        else:
+            scalars[name] = value
+    return {**scalars, **vectors}
@@ -0,0 +1,115 @@
+import os
+import time
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Columnar feature store: one Parquet dataset partitioned as
+#   <store>/corpus=<corpus>/extractor_version=<version>/mode=<mode>/run_id=<run>/part-*.parquet
+# Appends add new part files, and readers (pandas here, arrow::open_dataset
+# in R) load only the partitions and columns they ask for. The mode names how
+# the rows were computed (see run_mode), since e.g. excerpt or screened
+# metrics are not comparable with full-file ones.
+PARTITIONING = ds.partitioning(
+    pa.schema([
+        ("corpus", pa.string()),
+        ("extractor_version", pa.string()),
+        ("mode", pa.string()),
+        ("run_id", pa.string()),
+    ]),
+    flavor="hive",
+)
+FULL_MODE = "full"
+
+
+# Mode partition value from the parts that change a run's values, e.g.
+# run_mode("screened", None) -> "screened"; no parts -> FULL_MODE
+def run_mode(*parts):
+    return "-".join(part for part in parts if part) or FULL_MODE
+
+
+# Sortable run identifier, e.g. 20261018-142501
+def new_run_id():
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+# Numeric-looking columns are stored as float64 so nothing downstream has to
+# re-coerce them with pd.to_numeric(errors="coerce")
+def _typed_table(df, key_column):
+    df = df.copy()
+    for column in df.columns:
+        if column != key_column and df[column].dtype == object:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def append_features(store_dir, df, corpus, extractor_version, run_id, key_column="Filename", mode=FULL_MODE):
+    if df.empty:
+        return None
+    partition_dir = os.path.join(
+        store_dir, f"corpus={corpus}", f"extractor_version={extractor_version}", f"mode={mode}",
+        f"run_id={run_id}"
+    )
+    os.makedirs(partition_dir, exist_ok=True)
+    part_path = os.path.join(partition_dir, f"part-{uuid.uuid4().hex}.parquet")
+    pq.write_table(_typed_table(df, key_column), part_path)
+    return part_path
+
+
+# Versions are compared numerically where they are numbers ("10" > "9")
+def _version_key(version):
+    return (0, int(version), "") if version.isdigit() else (1, 0, version)
+
+
+# Runs that wrote different metric groups or modes have different columns, so
+# the dataset schema is the union of every part file's schema (a schema
+# inferred from the first fragment would silently drop the others' columns)
+def _open_dataset(store_dir):
+    dataset = ds.dataset(store_dir, format="parquet", partitioning=PARTITIONING)
+    schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+    schema = pa.unify_schemas(schemas + [PARTITIONING.schema])
+    return ds.dataset(store_dir, format="parquet", partitioning=PARTITIONING, schema=schema)
+
+
+# Load one corpus, optionally restricted to some columns. Rows of a single
+# run mode (full-file analysis by default) and a single extractor version
+# are returned: the newest version in the corpus by default, since metric
+# values are not comparable across versions or modes. With latest=True only
+# the most recent run's row is kept for every key. Raises ValueError when
+# nothing matches, e.g. a corpus name that differs from the --corpus the
+# rows were written with.
+def load_features(store_dir, corpus, columns=None, extractor_version="latest", mode=FULL_MODE,
+                  key_column="Filename", latest=True):
+    dataset = _open_dataset(store_dir)
+    expression = ds.field("corpus") == corpus
+    modes = set(dataset.to_table(columns=["mode"], filter=expression).column(0).to_pylist())
+    if not modes:
+        corpora = sorted(set(dataset.to_table(columns=["corpus"]).column(0).to_pylist()))
+        raise ValueError(f"No rows for corpus '{corpus}' in {store_dir} (corpora present: {corpora})")
+    if mode not in modes:
+        raise ValueError(f"No '{mode}' rows for corpus '{corpus}' in {store_dir} "
+                         f"(modes present: {sorted(m for m in modes if m is not None)})")
+    expression = expression & (ds.field("mode") == mode)
+    versions = dataset.to_table(columns=["extractor_version"], filter=expression).column(0).unique().to_pylist()
+    if extractor_version == "latest":
+        extractor_version = max(versions, key=_version_key)
+    elif str(extractor_version) not in versions:
+        raise ValueError(f"No rows for corpus '{corpus}' at extractor version {extractor_version} "
+                         f"in {store_dir} (versions present: {sorted(versions, key=_version_key)})")
+    expression = expression & (ds.field("extractor_version") == str(extractor_version))
+
+    projected = None
+    if columns is not None:
+        projected = list(dict.fromkeys([key_column, "corpus", "run_id", *columns]))
+    df = dataset.to_table(columns=projected, filter=expression).to_pandas()
+
+    if latest and not df.empty:
+        df = (df.sort_values("run_id")
+                .drop_duplicates(subset=[key_column, "corpus"], keep="last")
+                .sort_values(key_column)
+                .reset_index(drop=True))
+    if columns is not None:
+        df = df[[key_column, *[c for c in columns if c != key_column]]]
+    return df
@@ -0,0 +1,139 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+# On-disk archive of frame-level feature matrices, one directory per file:
+#   <archive>/<filename>/index.json        sr, hop_length and per-feature shape/dtype
+#   <archive>/<filename>/<feature>.npy     (n_frames, n_dims), time-major
+# Arrays are stored time-major and opened memory-mapped, so reading a window
+# only touches the pages (chunks of frames) inside it. Aggregates over any
+# time window can then be computed without decoding audio again.
+DEFAULT_DTYPE = np.float16
+
+STATS = {
+    "mean": np.mean,
+    "std": np.std,
+    "var": np.var,
+    "median": np.median,
+    "min": np.min,
+    "max": np.max,
+}
+
+
+# Store {feature: (n_dims, n_frames) matrix} for one file
+def write_frame_features(archive_dir, filename, frames, sr, hop_length, dtype=DEFAULT_DTYPE):
+    file_dir = os.path.join(archive_dir, filename)
+    os.makedirs(file_dir, exist_ok=True)
+    index = {"filename": filename, "sr": sr, "hop_length": hop_length, "features": {}}
+    for name, matrix in frames.items():
+        matrix = np.atleast_2d(np.asarray(matrix))
+        time_major = np.ascontiguousarray(matrix.T, dtype=dtype)
+        tmp_path = os.path.join(file_dir, f"{name}.npy.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, time_major)
+        os.replace(tmp_path, os.path.join(file_dir, f"{name}.npy"))
+        index["features"][name] = {"n_frames": time_major.shape[0], "n_dims": time_major.shape[1],
+                                   "dtype": np.dtype(dtype).name}
+    # The index is written last, so a file only appears once all its arrays exist
+    with open(os.path.join(file_dir, "index.json.tmp"), "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(os.path.join(file_dir, "index.json.tmp"), os.path.join(file_dir, "index.json"))
+
+
+class FrameArchive:
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+
+    def files(self):
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.archive_dir)
+            if os.path.exists(os.path.join(self.archive_dir, name, "index.json"))
+        )
+
+    def index(self, filename):
+        with open(os.path.join(self.archive_dir, filename, "index.json"), "r") as f:
+            return json.load(f)
+
+    # Memory-mapped (n_frames, n_dims) matrix
+    def load(self, filename, feature):
+        return np.load(os.path.join(self.archive_dir, filename, f"{feature}.npy"), mmap_mode="r")
+
+    def frame_times(self, filename, feature):
+        index = self.index(filename)
+        n_frames = index["features"][feature]["n_frames"]
+        return np.arange(n_frames) * index["hop_length"] / index["sr"]
+
+    # Frames between start and end seconds; negative times count back from
+    # the end of the file (start=-60 is the last minute)
+    def window(self, filename, feature, start=None, end=None):
+        index = self.index(filename)
+        frames_per_second = index["sr"] / index["hop_length"]
+        n_frames = index["features"][feature]["n_frames"]
+
+        def to_frame(seconds, default):
+            if seconds is None:
+                return default
+            frame = int(round(seconds * frames_per_second))
+            return max(0, min(n_frames, frame if frame >= 0 else n_frames + frame))
+
+        return self.load(filename, feature)[to_frame(start, 0):to_frame(end, n_frames)]
+
+    # One statistic per feature dimension over a time window (float64 result)
+    def aggregate(self, filename, feature, stat="mean", start=None, end=None):
+        frames = np.asarray(self.window(filename, feature, start, end), dtype=np.float64)
+        if len(frames) == 0:
+            return np.full(frames.shape[1], np.nan)
+        reduce = STATS[stat] if isinstance(stat, str) else stat
+        return reduce(frames, axis=0)
+
+    # Sliding-window mean and variance of every dimension, O(n_frames) via
+    # cumulative sums regardless of the window length. Returns (times, means, vars).
+    def rolling(self, filename, feature, window_seconds, hop_seconds):
+        index = self.index(filename)
+        frames_per_second = index["sr"] / index["hop_length"]
+        frames = np.asarray(self.load(filename, feature), dtype=np.float64)
+        window = max(1, int(round(window_seconds * frames_per_second)))
+        hop = max(1, int(round(hop_seconds * frames_per_second)))
+        if len(frames) < window:
+            empty = np.empty((0, frames.shape[1]))
+            return np.empty(0), empty, empty
+        zeros = np.zeros((1, frames.shape[1]))
+        cumsum = np.concatenate((zeros, np.cumsum(frames, axis=0)))
+        cumsum_sq = np.concatenate((zeros, np.cumsum(frames ** 2, axis=0)))
+        starts = np.arange(0, len(frames) - window + 1, hop)
+        means = (cumsum[starts + window] - cumsum[starts]) / window
+        variances = np.maximum((cumsum_sq[starts + window] - cumsum_sq[starts]) / window - means ** 2, 0.0)
+        return starts / frames_per_second, means, variances
+
+    # One row per archived file with <feature>_<stat>_<i> columns
+    def corpus_aggregate(self, feature, stat="mean", start=None, end=None):
+        rows = []
+        for filename in self.files():
+            if feature not in self.index(filename)["features"]:
+                continue
+            values = self.aggregate(filename, feature, stat, start, end)
+            rows.append({"filename": filename,
+                         **{f"{feature}_{stat}_{i + 1}": v for i, v in enumerate(values)}})
+        return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Windowed statistics from the frame-level feature archive.")
+    parser.add_argument("archive", help="Frame archive directory")
+    parser.add_argument("feature", help="Archived feature, e.g. mfcc or chroma_cqt")
+    parser.add_argument("--stat", default="mean", choices=list(STATS))
+    parser.add_argument("--start", type=float, default=None, help="Window start in seconds (negative = from the end)")
+    parser.add_argument("--end", type=float, default=None, help="Window end in seconds (negative = from the end)")
+    parser.add_argument("--output", default=None, help="CSV to write (prints to stdout otherwise)")
+    args = parser.parse_args()
+
+    table = FrameArchive(args.archive).corpus_aggregate(args.feature, args.stat, args.start, args.end)
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"Windowed {args.stat} of {args.feature} saved to {args.output}")
+    else:
+        print(table.to_string(index=False))
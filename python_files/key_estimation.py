@@ -0,0 +1,100 @@
+import argparse
+import numpy as np
+import pandas as pd
+from frame_archive import FrameArchive
+
+# Krumhansl-Kessler key finding, batched. Every 12-bin chroma vector (one per
+# file, or one per window) is correlated against the 24 rotated major/minor
+# templates with a single matrix product:
+#   z-scored chroma (n, 12) @ z-scored templates (12, 24) / 12 = Pearson r (n, 24)
+# so thousands of files or windows take milliseconds. Bin 0 is C in both the
+# librosa chroma features and the pitch-class histograms.
+MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+PITCH_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+MODES = ['major', 'minor']
+KEY_COLUMNS = ['Key', 'Mode', 'Key Correlation', 'Key Confidence']
+
+# Columns holding the 12 chroma bins in the extractor outputs
+CHROMA_SOURCES = {
+    'chroma_cqt': [f"chroma_cqt_{i + 1}" for i in range(12)],          # librosa_work.py
+    'chroma_stft': [f"chroma_stft_{i + 1}" for i in range(12)],        # librosa_work.py
+    'chroma_cens': [f"chroma_cens_{i + 1}" for i in range(12)],        # librosa_work.py
+    'histogram': [f"pc_{pitch}" for pitch in range(12)],               # pitch_class_profiles.py
+}
+
+
+def _zscore(matrix):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    centered = matrix - matrix.mean(axis=-1, keepdims=True)
+    scale = np.sqrt((centered ** 2).mean(axis=-1, keepdims=True))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return centered / scale
+
+
+# (24, 12) templates: rows 0-11 major keys on C..B, rows 12-23 minor keys
+def key_templates():
+    rotations = (np.arange(12)[None, :] - np.arange(12)[:, None]) % 12
+    return np.vstack((MAJOR_PROFILE[rotations], MINOR_PROFILE[rotations]))
+
+
+# Correlation of every chroma vector with all 24 keys, shape (n, 24). Flat
+# vectors (silence) come out as NaN.
+def key_correlations(chroma):
+    chroma = np.atleast_2d(chroma)
+    return _zscore(chroma) @ _zscore(key_templates()).T / 12
+
+
+# Best key per vector: tonic index (0 = C), mode index (0 = major), its
+# correlation, and the margin over the runner-up key as a confidence
+def estimate_keys(chroma):
+    correlations = key_correlations(chroma)
+    valid = ~np.isnan(correlations).any(axis=1)
+    correlations = np.where(valid[:, None], correlations, -np.inf)
+    top_two = np.argsort(correlations, axis=1)[:, -2:]
+    rows = np.arange(len(correlations))
+    best = top_two[:, 1]
+    best_r = correlations[rows, best]
+    margin = best_r - correlations[rows, top_two[:, 0]]
+    return (best % 12, best // 12,
+            np.where(valid, best_r, np.nan), np.where(valid, margin, np.nan), valid)
+
+
+# KEY_COLUMNS for every row of `chroma` (None / NaN for flat vectors)
+def key_table(chroma, index=None):
+    tonic, mode, correlation, confidence, valid = estimate_keys(chroma)
+    return pd.DataFrame({
+        'Key': np.where(valid, np.array(PITCH_NAMES, dtype=object)[tonic], None),
+        'Mode': np.where(valid, np.array(MODES, dtype=object)[mode], None),
+        'Key Correlation': correlation,
+        'Key Confidence': confidence,
+    }, index=index)
+
+
+# Append key columns to an extractor table that has the 12 `source` columns
+def add_key_columns(df, source='chroma_cqt'):
+    columns = CHROMA_SOURCES.get(source, source)
+    return pd.concat([df, key_table(df[columns].to_numpy(dtype=np.float64), index=df.index)], axis=1)
+
+
+# Key over time for one archived file: sliding-window mean chroma from the
+# frame archive, one key per window
+def windowed_keys(archive_dir, filename, window_seconds, hop_seconds, feature='chroma_cqt'):
+    times, means, _ = FrameArchive(archive_dir).rolling(filename, feature, window_seconds, hop_seconds)
+    table = key_table(means)
+    table.insert(0, 'Time (s)', times)
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate keys from per-file chroma or pitch-class histograms.")
+    parser.add_argument("input", help="Extractor CSV (librosa_work.py features or pitch-class histograms)")
+    parser.add_argument("--source", default="chroma_cqt", choices=list(CHROMA_SOURCES),
+                        help="Which 12 columns to use as the chroma vector")
+    parser.add_argument("--output", default=None, help="CSV to write (defaults to <input>_keys.csv)")
+    args = parser.parse_args()
+
+    table = add_key_columns(pd.read_csv(args.input), args.source)
+    output = args.output or args.input.rsplit(".", 1)[0] + "_keys.csv"
+    table.to_csv(output, index=False)
+    print(f"Keys for {len(table)} row(s) saved to {output}")
@@ -0,0 +1,130 @@
+import sys
+import json
+import argparse
+import librosa
+import numpy as np
+from analysis_context import DEFAULT_SR
+from pitch_classes import PitchClassAccumulator, INVALID_MIDI, to_pitch_classes, pitch_class_histogram
+from pitch_timeline import histogram_entropy
+from key_estimation import PITCH_NAMES, MODES, estimate_keys
+from streaming_analysis import StreamingFrameAnalyzer, read_pcm_blocks
+
+# Incremental analysis of a live PCM stream (stdin or a named pipe), e.g.
+#   ffmpeg -i <capture> -f f32le -ac 1 -ar 22050 - | python live_analysis.py
+# Samples go through the same StreamingFrameAnalyzer as the streaming file
+# mode. Only the last WINDOW_SECONDS of frame tracks (onset strength and
+# dominant pitch class) are kept for the rolling metrics, plus a running
+# PitchClassAccumulator for the whole capture, so memory stays constant
+# however long the recording runs. Every EMIT_SECONDS of audio one JSON line
+# is written with the rolling tempo, onset density, pitch-class histogram,
+# pitch entropy and best key. Latency is at most one read block
+# (BLOCK_SECONDS) plus half an STFT frame.
+BLOCK_SECONDS = 0.5
+WINDOW_SECONDS = 30.0
+EMIT_SECONDS = 5.0
+PCM_FORMATS = {"f32le": np.float32, "s16le": np.int16, "s32le": np.int32}
+
+
+class LiveAnalyzer:
+    def __init__(self, sr=DEFAULT_SR, window_seconds=WINDOW_SECONDS, emit_seconds=EMIT_SECONDS):
+        self.analyzer = StreamingFrameAnalyzer(sr=sr)
+        self.sr = sr
+        self.frames_per_second = sr / self.analyzer.hop_length
+        self.window_frames = int(round(window_seconds * self.frames_per_second))
+        self.emit_frames = max(1, int(round(emit_seconds * self.frames_per_second)))
+        self.onset_window = np.empty(0, dtype=np.float32)
+        self.pitch_window = np.empty(0, dtype=np.int16)
+        self.accumulator = PitchClassAccumulator()
+        self.next_emit = self.emit_frames
+
+    # Feed a block of samples; returns the metric records due so far
+    def update(self, samples, final=False):
+        midi, onset = self.analyzer.process(samples, final=final)
+        pitch_classes = np.where(midi != INVALID_MIDI, midi % 12, INVALID_MIDI).astype(np.int16)
+        self.accumulator.update(to_pitch_classes(midi))
+
+        records = []
+        # Frames are appended up to each emit boundary so every record covers
+        # exactly the window ending there, even when a block spans several
+        start = 0
+        while self.analyzer.n_frames >= self.next_emit:
+            end = len(midi) - (self.analyzer.n_frames - self.next_emit)
+            self._append(onset[start:end], pitch_classes[start:end])
+            records.append(self.metrics())
+            start = end
+            self.next_emit += self.emit_frames
+        self._append(onset[start:], pitch_classes[start:])
+        if final and self.analyzer.n_frames > self.next_emit - self.emit_frames:
+            records.append(self.metrics())
+        return records
+
+    def finish(self):
+        return self.update(np.empty(0, dtype=np.float32), final=True)
+
+    def _append(self, onset, pitch_classes):
+        self.onset_window = np.concatenate((self.onset_window, onset))[-self.window_frames:]
+        self.pitch_window = np.concatenate((self.pitch_window, pitch_classes))[-self.window_frames:]
+
+    def metrics(self):
+        window_seconds = len(self.onset_window) / self.frames_per_second
+        hop_length = self.analyzer.hop_length
+        if len(self.onset_window) > 1 and self.onset_window.max() > 0:
+            tempo = float(np.atleast_1d(librosa.beat.tempo(
+                onset_envelope=self.onset_window, sr=self.sr, hop_length=hop_length))[0])
+            onsets = librosa.onset.onset_detect(onset_envelope=self.onset_window, sr=self.sr,
+                                                hop_length=hop_length)
+            onset_density = len(onsets) / window_seconds
+        else:
+            tempo, onset_density = np.nan, 0.0
+
+        counts = pitch_class_histogram(self.pitch_window[self.pitch_window != INVALID_MIDI])
+        tonic, mode, _, confidence, valid = estimate_keys(counts)
+        return {
+            "time_s": round(self.analyzer.n_frames / self.frames_per_second, 3),
+            "window_s": round(window_seconds, 3),
+            "tempo_bpm": tempo,
+            "onset_density": onset_density,
+            "pitch_class_counts": counts.tolist(),
+            "pitch_entropy": float(histogram_entropy(counts[None, :])[0]),
+            "key": f"{PITCH_NAMES[tonic[0]]} {MODES[mode[0]]}" if valid[0] else None,
+            "key_confidence": float(confidence[0]),
+            "total_pitch_entropy": float(self.accumulator.stats()[3]),
+        }
+
+
+def _json_value(value):
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling tempo and pitch metrics from a live PCM stream.")
+    parser.add_argument("input", nargs="?", default="-", help="Named pipe or file to read ('-' for stdin)")
+    parser.add_argument("--format", choices=list(PCM_FORMATS), default="f32le", help="Raw PCM sample format")
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--sr", type=int, default=DEFAULT_SR, help="Sample rate of the incoming PCM")
+    parser.add_argument("--window", type=float, default=WINDOW_SECONDS, help="Rolling window in seconds")
+    parser.add_argument("--every", type=float, default=EMIT_SECONDS, help="Emit metrics every N seconds of audio")
+    parser.add_argument("--output", default=None, help="Append JSON lines here instead of stdout")
+    args = parser.parse_args()
+
+    live = LiveAnalyzer(sr=args.sr, window_seconds=args.window, emit_seconds=args.every)
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    sink = open(args.output, "a") if args.output else sys.stdout
+
+    def emit(records):
+        for record in records:
+            sink.write(json.dumps({key: _json_value(value) for key, value in record.items()}) + "\n")
+        sink.flush()
+
+    try:
+        for samples in read_pcm_blocks(source, int(BLOCK_SECONDS * args.sr), PCM_FORMATS[args.format],
+                                       args.channels):
+            emit(live.update(samples))
+        emit(live.finish())
+    except KeyboardInterrupt:
+        emit(live.finish())
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
@@ -0,0 +1,118 @@
+import argparse
+import librosa
+import numpy as np
+from scipy.ndimage import median_filter, uniform_filter1d
+from analysis_context import DEFAULT_SR
+from audio_cache import load_audio
+
+# Cheap first pass that finds the music in a recording before the heavy
+# extractors run. Non-overlapping 2048-sample frames (a quarter of the STFT
+# work of the main analysis) are labelled from RMS, spectral flatness and
+# zero-crossing rate:
+#   silence   RMS more than SILENCE_DB below the loudest frame
+#   noise     spectrally flat (applause, crowd noise, tape hiss)
+#   speech    syllabic energy modulation: over ~1 s, many frames far below
+#             the local mean RMS, with a speech-like zero-crossing rate
+#   music     everything else
+# Labels are median-smoothed over SMOOTHING_SECONDS so single frames can't
+# split a region, and music regions shorter than MIN_REGION_SECONDS are
+# dropped. The thresholds are heuristics tuned for YouTube rips of live jazz.
+FRAME_LENGTH = 2048
+SILENCE_DB = 45.0
+NOISE_FLATNESS = 0.35
+SPEECH_WINDOW_SECONDS = 1.0
+SPEECH_LOW_ENERGY_RATIO = 0.5      # frames below half the local mean RMS
+SPEECH_LOW_ENERGY_FRACTION = 0.35  # share of such frames in the window
+SPEECH_ZCR_RANGE = (0.02, 0.25)
+SMOOTHING_SECONDS = 2.0
+MIN_REGION_SECONDS = 5.0
+MIN_MUSIC_SECONDS = 10.0           # files with less music are rejected
+
+MUSIC, SILENCE, NOISE, SPEECH = 0, 1, 2, 3
+LABEL_NAMES = {MUSIC: "music", SILENCE: "silence", NOISE: "noise", SPEECH: "speech"}
+SCREENING_COLUMNS = ['Music Seconds', 'Skipped Seconds', 'Speech Seconds', 'Noise Seconds', 'Silence Seconds']
+
+
+def _odd(n):
+    n = max(1, int(round(n)))
+    return n if n % 2 else n + 1
+
+
+# One label per FRAME_LENGTH samples
+def frame_labels(y, sr):
+    frames_per_second = sr / FRAME_LENGTH
+    magnitude = np.abs(librosa.stft(y, n_fft=FRAME_LENGTH, hop_length=FRAME_LENGTH, center=False))
+    if magnitude.shape[1] == 0:
+        return np.empty(0, dtype=np.int8)
+    rms = librosa.feature.rms(S=magnitude, frame_length=FRAME_LENGTH)[0]
+    flatness = librosa.feature.spectral_flatness(S=magnitude)[0]
+    zcr = librosa.feature.zero_crossing_rate(y, frame_length=FRAME_LENGTH, hop_length=FRAME_LENGTH,
+                                             center=False)[0][:len(rms)]
+
+    window = _odd(SPEECH_WINDOW_SECONDS * frames_per_second)
+    local_rms = uniform_filter1d(rms, window, mode="nearest")
+    low_energy = uniform_filter1d((rms < SPEECH_LOW_ENERGY_RATIO * local_rms).astype(np.float64), window,
+                                  mode="nearest")
+    local_zcr = uniform_filter1d(zcr, window, mode="nearest")
+
+    labels = np.full(len(rms), MUSIC, dtype=np.int8)
+    speech = ((low_energy > SPEECH_LOW_ENERGY_FRACTION)
+              & (local_zcr > SPEECH_ZCR_RANGE[0]) & (local_zcr < SPEECH_ZCR_RANGE[1]))
+    labels[speech] = SPEECH
+    labels[flatness > NOISE_FLATNESS] = NOISE
+    labels[librosa.amplitude_to_db(rms, ref=np.max) < -SILENCE_DB] = SILENCE
+    return median_filter(labels, size=_odd(SMOOTHING_SECONDS * frames_per_second), mode="nearest")
+
+
+# (start, end) sample ranges of the music regions
+def music_regions(labels, sr, min_region_seconds=MIN_REGION_SECONDS):
+    is_music = np.concatenate(([False], labels == MUSIC, [False]))
+    edges = np.flatnonzero(np.diff(is_music.astype(np.int8)))
+    starts, ends = edges[0::2] * FRAME_LENGTH, edges[1::2] * FRAME_LENGTH
+    keep = (ends - starts) >= min_region_seconds * sr
+    return list(zip(starts[keep], ends[keep]))
+
+
+# Music regions as (start, end) sample ranges and a SCREENING_COLUMNS report.
+# The regions are meant to be analysed one by one: concatenating them would
+# put artificial splices (and spurious onsets) into the signal. The list is
+# empty when the file has less than MIN_MUSIC_SECONDS of music.
+def screen_music(y, sr, min_music_seconds=MIN_MUSIC_SECONDS):
+    labels = frame_labels(y, sr)
+    regions = music_regions(labels, sr)
+    frame_seconds = FRAME_LENGTH / sr
+    music_seconds = sum(end - start for start, end in regions) / sr
+    report = dict(zip(SCREENING_COLUMNS, (
+        music_seconds,
+        len(y) / sr - music_seconds,
+        np.sum(labels == SPEECH) * frame_seconds,
+        np.sum(labels == NOISE) * frame_seconds,
+        np.sum(labels == SILENCE) * frame_seconds,
+    )))
+    if music_seconds < min_music_seconds:
+        return [], report
+    return regions, report
+
+
+# Human-readable timeline of a file's labels, merged into spans
+def label_spans(labels, sr):
+    if len(labels) == 0:
+        return []
+    change = np.flatnonzero(np.diff(labels)) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change, [len(labels)]))
+    frame_seconds = FRAME_LENGTH / sr
+    return [(start * frame_seconds, end * frame_seconds, LABEL_NAMES[int(labels[start])])
+            for start, end in zip(starts, ends)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the music / speech / noise / silence spans of a recording.")
+    parser.add_argument("file", help="Audio file")
+    args = parser.parse_args()
+
+    y, sr = load_audio(args.file, sr=DEFAULT_SR)
+    for start, end, label in label_spans(frame_labels(y, sr), sr):
+        print(f"{start:8.1f}s - {end:8.1f}s  {label}")
+    _, report = screen_music(y, sr)
+    print(", ".join(f"{name}: {value:.1f}" for name, value in report.items()))
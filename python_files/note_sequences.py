@@ -0,0 +1,111 @@
+import os
+import json
+import numpy as np
+from pitch_classes import INVALID_MIDI
+
+# Compact binary store for sampled note sequences, replacing the
+# "0.50s: C4; 1.00s: D#4" summary strings. All files share three flat
+# arrays plus an index of (offset, length) per file:
+#   <store>/midi.<g>.npy    int8    MIDI note number (-1 where invalid)
+#   <store>/times.<g>.npy   float32 sample time in seconds
+#   <store>/valid.<g>.npy   bool    validity mask
+#   <store>/index.json      {"generation": g, "files": {filename: [offset, length]}}
+# Readers memory-map the arrays and slice them per file; no text parsing.
+# Every save writes a new generation of arrays and then swaps index.json,
+# which is the only commit point: a save interrupted before the swap leaves
+# the previous generation (and its index) intact.
+ARRAYS = {"midi": np.int8, "times": np.float32, "valid": np.bool_}
+
+
+class NoteSequenceStore:
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.index = {}
+        self.generation = None  # None: arrays of a store written before generations
+        index_path = os.path.join(store_dir, "index.json")
+        if os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                data = json.load(f)
+            if isinstance(data.get("generation"), int) and isinstance(data.get("files"), dict):
+                self.generation, self.index = data["generation"], data["files"]
+            else:
+                self.index = data
+        self._pending = {}
+
+    def files(self):
+        return sorted(set(self.index) | set(self._pending))
+
+    def _path(self, name, generation):
+        suffix = "" if generation is None else f".{generation}"
+        return os.path.join(self.store_dir, f"{name}{suffix}.npy")
+
+    def _array(self, name):
+        path = self._path(name, self.generation)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=ARRAYS[name])
+        return np.load(path, mmap_mode="r")
+
+    # Queue one file's sequence; MIDI is clipped into int8 range (notes above
+    # G9 can't come out of a 22.05 kHz STFT anyway)
+    def add(self, filename, times, midi, valid=None):
+        midi = np.asarray(midi)
+        if valid is None:
+            valid = midi != INVALID_MIDI
+        midi = np.where(valid, np.clip(midi, 0, 127), INVALID_MIDI)
+        self._pending[filename] = (
+            np.asarray(times, dtype=np.float32), midi.astype(np.int8), np.asarray(valid, dtype=bool)
+        )
+
+    # Write the flat arrays with the queued sequences appended as a new
+    # generation (a re-added file replaces its earlier sequence)
+    def save(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        kept = [name for name in sorted(self.index) if name not in self._pending]
+        arrays = {name: [] for name in ARRAYS}
+        index = {}
+        offset = 0
+        for filename in kept:
+            times, midi, valid = self.get(filename)
+            for name, values in zip(ARRAYS, (midi, times, valid)):
+                arrays[name].append(np.asarray(values))
+            index[filename] = [offset, len(times)]
+            offset += len(times)
+        for filename in sorted(self._pending):
+            times, midi, valid = self._pending[filename]
+            for name, values in zip(ARRAYS, (midi, times, valid)):
+                arrays[name].append(values)
+            index[filename] = [offset, len(times)]
+            offset += len(times)
+
+        generation = 0 if self.generation is None else self.generation + 1
+        for name, dtype in ARRAYS.items():
+            data = np.concatenate(arrays[name]).astype(dtype) if arrays[name] else np.empty(0, dtype=dtype)
+            with open(self._path(name, generation), "wb") as f:
+                np.save(f, data)
+        with open(os.path.join(self.store_dir, "index.json.tmp"), "w") as f:
+            json.dump({"generation": generation, "files": index}, f)
+        os.replace(os.path.join(self.store_dir, "index.json.tmp"), os.path.join(self.store_dir, "index.json"))
+
+        # The previous generation is only removed once the new index is in place
+        previous = self.generation
+        self.index, self.generation = index, generation
+        self._pending = {}
+        for name in ARRAYS:
+            try:
+                os.remove(self._path(name, previous))
+            except OSError:
+                pass
+
+    # (times, midi, valid) arrays for one file
+    def get(self, filename):
+        if filename in self._pending:
+            return self._pending[filename]
+        offset, length = self.index[filename]
+        return tuple(self._array(name)[offset:offset + length] for name in ("times", "midi", "valid"))
+
+    # Whole-corpus arrays plus a per-sample file number, for vectorized analysis
+    def all(self):
+        files = sorted(self.index, key=lambda name: self.index[name][0])
+        lengths = [self.index[name][1] for name in files]
+        file_ids = np.repeat(np.arange(len(files)), lengths)
+        return files, file_ids, self._array("times"), self._array("midi"), self._array("valid")
@@ -0,0 +1,118 @@
+import os
+import functools
+import librosa
+import numpy as np
+import pandas as pd
+from pitch_classes import PitchClassAccumulator, dominant_midi, to_pitch_classes, pitch_class_histogram
+from streaming_analysis import StreamingFrameAnalyzer, decoded_blocks
+from audio_cache import load_audio
+from stage_trace import stage, traced_file
+from extraction_manifest import ExtractionManifest, check_columns, checkpoint_row, merge_checkpointed_rows
+from audio_files import list_audio_files, longest_first
+from supervised_workers import run_supervised
+
+# Per-file pitch-class histograms for key profiles. Every file is reduced to
+# 12 frame counts (one per pitch class) that are persisted in a CSV:
+#   Filename, Content Hash, pc_0 .. pc_11
+# Counts are plain sums, so any grouping of files (the whole corpus, an
+# artist, a year) is profiled by adding up its rows and normalizing. Adding
+# recordings only extracts the new files; the aggregate is re-reduced from
+# the stored rows.
+HISTOGRAM_VERSION = "1"
+MAX_WORKERS = os.cpu_count() or 1
+PITCH_CLASS_COLUMNS = [f"pc_{pitch}" for pitch in range(12)]
+HISTOGRAM_COLUMNS = ['Filename', 'Content Hash'] + PITCH_CLASS_COLUMNS
+
+
+# Frame counts of the dominant pitch class of every STFT frame, truncating
+# like int(hz_to_midi(freq))
+def file_histogram(file_path, streaming=False):
+    if streaming:
+        # Same counts, fed through a running accumulator one block at a time
+        with stage("streaming_analysis"):
+            analyzer = StreamingFrameAnalyzer(rounding=np.floor, track_onsets=False)
+            accumulator = PitchClassAccumulator()
+            for samples in decoded_blocks(file_path):
+                accumulator.update(to_pitch_classes(analyzer.process(samples)[0]))
+            accumulator.update(to_pitch_classes(analyzer.finish()[0]))
+        return accumulator.counts
+
+    with stage("load"):
+        y, sr = load_audio(file_path)
+    with stage("stft"):
+        magnitude = np.abs(librosa.stft(y))
+    frequencies = librosa.fft_frequencies(sr=sr)
+    with stage("pitch_classes"):
+        return pitch_class_histogram(to_pitch_classes(dominant_midi(magnitude, frequencies, rounding=np.floor)))
+
+
+# One HISTOGRAM_COLUMNS row (runs in a worker process)
+def histogram_row(file_path, content_hash=None, streaming=False):
+    with traced_file(file_path):
+        counts = file_histogram(file_path, streaming)
+    return [os.path.basename(file_path), content_hash, *counts.tolist()]
+
+
+# Extract histograms for new or changed files in `directory` and append them
+# to `histogram_csv`. Returns the full table (earlier runs included).
+def update_histograms(directory, histogram_csv, max_workers=MAX_WORKERS, streaming=False):
+    check_columns(histogram_csv, HISTOGRAM_COLUMNS)
+    manifest = ExtractionManifest(histogram_csv + ".manifest.json", HISTOGRAM_VERSION)
+    file_paths = list_audio_files(directory)
+    pending = manifest.pending(file_paths)
+    print(f"🔁 {len(file_paths) - len(pending)} file(s) already counted, {len(pending)} to process")
+
+    # Hashes are taken here (and cached in the manifest) so workers don't re-read the files
+    hashes = {path: manifest.content_hash(path) for path in pending}
+
+    def checkpoint(file_path, row):
+        checkpoint_row(histogram_csv, HISTOGRAM_COLUMNS, row)
+        manifest.mark_done(file_path)
+
+    if max_workers > 1 and len(pending) > 1:
+        compute = functools.partial(_histogram_row_for, hashes=hashes, streaming=streaming)
+        failures = run_supervised(longest_first(pending), compute, max_workers=max_workers, on_row=checkpoint)
+        for path, error in failures:
+            print(f"Error processing {os.path.basename(path)}: {error}")
+    else:
+        for file_path in pending:
+            try:
+                checkpoint(file_path, histogram_row(file_path, hashes[file_path], streaming))
+            except Exception as e:
+                print(f"Error processing {os.path.basename(file_path)}: {e}")
+
+    merge_checkpointed_rows(histogram_csv, 'Filename')
+    return load_histograms(histogram_csv)
+
+
+def _histogram_row_for(file_path, hashes, streaming):
+    return histogram_row(file_path, hashes[file_path], streaming)
+
+
+def load_histograms(histogram_csv):
+    if not os.path.exists(histogram_csv):
+        return pd.DataFrame(columns=HISTOGRAM_COLUMNS)
+    return pd.read_csv(histogram_csv)
+
+
+# Reduce histograms into normalized profiles: one row for the whole table, or
+# one per group when `group_by` names columns of `metadata` (joined on
+# Filename), e.g. group_by=['Artist'] or ['Year']. Rows carry the summed
+# counts, the file count and the proportion of every pitch class.
+def merge_profiles(histograms, metadata=None, group_by=None, key_column='Filename'):
+    if metadata is not None:
+        histograms = histograms.merge(metadata, on=key_column, how='inner')
+    counts = histograms[PITCH_CLASS_COLUMNS].astype(np.int64)
+    if group_by:
+        summed = counts.groupby([histograms[column] for column in group_by]).sum()
+        files = histograms.groupby(group_by).size()
+    else:
+        summed = counts.sum().to_frame().T
+        files = pd.Series([len(histograms)])
+    totals = summed.sum(axis=1)
+    proportions = summed.div(totals.where(totals > 0, 1), axis=0)
+    proportions.columns = [f"proportion_{pitch}" for pitch in range(12)]
+    profiles = pd.concat([summed, proportions], axis=1)
+    profiles.insert(0, 'Files', files.values)
+    profiles.insert(1, 'Frames', totals.values)
+    return profiles.reset_index() if group_by else profiles.reset_index(drop=True)
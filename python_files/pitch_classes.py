@@ -0,0 +1,109 @@
+import librosa
+import numpy as np
+from scipy.stats import entropy
+
+# Marker for frames without a usable dominant frequency (dominant bin is DC)
+INVALID_MIDI = -1
+
+
+# Dominant STFT bin of every frame as an integer MIDI number. rounding=np.rint
+# matches hz_to_note -> note_to_midi (nearest note); np.floor matches
+# int(hz_to_midi(freq)) as used by the key profile.
+def dominant_midi(magnitude, frequencies, rounding=np.rint):
+    dominant_frequencies = frequencies[np.argmax(magnitude, axis=0)]
+    valid = dominant_frequencies > 0
+    midi = np.full(len(dominant_frequencies), INVALID_MIDI, dtype=np.int16)
+    midi[valid] = rounding(librosa.hz_to_midi(dominant_frequencies[valid]))
+    return midi
+
+
+# Frame indices closest to (at or after) every multiple of `interval` seconds
+def frames_at_interval(frame_times, interval):
+    if len(frame_times) == 0:
+        return np.array([], dtype=int)
+    return np.searchsorted(frame_times, np.arange(0, frame_times[-1], interval))
+
+
+def to_pitch_classes(midi):
+    midi = np.asarray(midi)
+    return midi[midi != INVALID_MIDI] % 12
+
+
+def pitch_class_histogram(pitch_classes):
+    return np.bincount(pitch_classes, minlength=12)
+
+
+# Pitch SD, mean, median, entropy (bits) and intervallic variability of a
+# pitch-class sequence
+def pitch_class_stats(pitch_classes):
+    pitch_classes = np.asarray(pitch_classes)
+    if len(pitch_classes) == 0:
+        return np.nan, np.nan, np.nan, np.nan, np.nan
+    pitch_entropy = entropy(pitch_class_histogram(pitch_classes), base=2)
+    intervals = np.diff(pitch_classes)
+    intervallic_variability = np.std(intervals) if len(intervals) > 0 else np.nan
+    return (
+        np.std(pitch_classes), np.mean(pitch_classes), np.median(pitch_classes),
+        pitch_entropy, intervallic_variability
+    )
+
+
+# Running pitch-class statistics that can be fed one block at a time. Keeps
+# only a 12-bin histogram and a handful of sums, so memory is constant no
+# matter how many frames go through it; the median comes from the histogram.
+class PitchClassAccumulator:
+    def __init__(self):
+        self.counts = np.zeros(12, dtype=np.int64)
+        self.interval_count = 0
+        self.interval_sum = 0.0
+        self.interval_sum_sq = 0.0
+        self.last_pitch_class = None
+
+    def update(self, pitch_classes):
+        pitch_classes = np.asarray(pitch_classes, dtype=np.int64)
+        if len(pitch_classes) == 0:
+            return
+        self.counts += pitch_class_histogram(pitch_classes)
+        if self.last_pitch_class is not None:
+            pitch_classes_with_last = np.concatenate(([self.last_pitch_class], pitch_classes))
+        else:
+            pitch_classes_with_last = pitch_classes
+        intervals = np.diff(pitch_classes_with_last)
+        self.interval_count += len(intervals)
+        self.interval_sum += intervals.sum()
+        self.interval_sum_sq += (intervals.astype(np.float64) ** 2).sum()
+        self.last_pitch_class = int(pitch_classes[-1])
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.interval_count += other.interval_count
+        self.interval_sum += other.interval_sum
+        self.interval_sum_sq += other.interval_sum_sq
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def median(self):
+        n = self.total
+        cumulative = np.cumsum(self.counts)
+        lower = np.searchsorted(cumulative, (n - 1) // 2, side="right")
+        upper = np.searchsorted(cumulative, n // 2, side="right")
+        return (lower + upper) / 2
+
+    # Same tuple as pitch_class_stats, computed from the running sums
+    def stats(self):
+        n = self.total
+        if n == 0:
+            return np.nan, np.nan, np.nan, np.nan, np.nan
+        classes = np.arange(12)
+        mean = (classes * self.counts).sum() / n
+        sd = np.sqrt(max((classes ** 2 * self.counts).sum() / n - mean ** 2, 0.0))
+        if self.interval_count > 0:
+            interval_mean = self.interval_sum / self.interval_count
+            intervallic_variability = np.sqrt(
+                max(self.interval_sum_sq / self.interval_count - interval_mean ** 2, 0.0)
+            )
+        else:
+            intervallic_variability = np.nan
+        return sd, mean, self.median(), entropy(self.counts, base=2), intervallic_variability
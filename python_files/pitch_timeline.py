@@ -0,0 +1,100 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from analysis_context import HOP_LENGTH
+from pitch_classes import INVALID_MIDI
+from key_estimation import PITCH_NAMES, MODES, estimate_keys
+
+# Time-resolved pitch-class statistics: histograms, entropy and best key over
+# sliding windows of every STFT frame's dominant pitch class. Window counts
+# come from differences of a cumulative (n_frames + 1, 12) histogram, so the
+# cost is O(n_frames) whatever the window length. Each file's series is
+# written to <timeline_dir>/<filename>.npz:
+#   times       float32 (n_windows,)      window start in seconds
+#   counts      uint32  (n_windows, 12)   frames per pitch class (C..B)
+#   entropy     float32 (n_windows,)      pitch-class entropy in bits
+#   key         int8    (n_windows,)      tonic 0-11, -1 without pitched frames
+#   mode        int8    (n_windows,)      0 major, 1 minor, -1 without pitched frames
+#   confidence  float32 (n_windows,)      margin over the runner-up key
+WINDOW_SECONDS = 10.0
+HOP_SECONDS = 2.0
+
+
+# Frame counts of every pitch class in each window (one window per hop). When
+# the last full window stops short of the end of the file, one more window
+# starting a hop later covers the remaining frames and is shorter.
+def sliding_pitch_class_histograms(midi, frames_per_second, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS):
+    midi = np.asarray(midi)
+    window = max(1, int(round(window_seconds * frames_per_second)))
+    hop = max(1, int(round(hop_seconds * frames_per_second)))
+
+    one_hot = np.zeros((len(midi) + 1, 12), dtype=np.int32)
+    valid = np.flatnonzero(midi != INVALID_MIDI)
+    one_hot[valid + 1, midi[valid] % 12] = 1
+    cumulative = np.cumsum(one_hot, axis=0)
+
+    starts = np.arange(0, max(len(midi) - window, 0) + 1, hop)
+    if starts[-1] + window < len(midi) and starts[-1] + hop < len(midi):
+        starts = np.append(starts, starts[-1] + hop)
+    ends = np.minimum(starts + window, len(midi))
+    return starts / frames_per_second, cumulative[ends] - cumulative[starts]
+
+
+# Entropy (bits) of every histogram row; NaN for empty windows
+def histogram_entropy(counts):
+    counts = np.asarray(counts, dtype=np.float64)
+    totals = counts.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = counts / totals
+        terms = np.where(p > 0, p * np.log2(p), 0.0)
+    return np.where(totals[:, 0] > 0, -terms.sum(axis=1), np.nan)
+
+
+def pitch_timeline(midi, sr, hop_length=HOP_LENGTH, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS):
+    times, counts = sliding_pitch_class_histograms(midi, sr / hop_length, window_seconds, hop_seconds)
+    tonic, mode, _, confidence, valid = estimate_keys(counts)
+    return {
+        "times": times.astype(np.float32),
+        "counts": counts.astype(np.uint32),
+        "entropy": histogram_entropy(counts).astype(np.float32),
+        "key": np.where(valid, tonic, -1).astype(np.int8),
+        "mode": np.where(valid, mode, -1).astype(np.int8),
+        "confidence": confidence.astype(np.float32),
+    }
+
+
+def write_timeline(timeline_dir, filename, timeline):
+    os.makedirs(timeline_dir, exist_ok=True)
+    tmp_path = os.path.join(timeline_dir, f"{filename}.tmp.npz")
+    np.savez_compressed(tmp_path, **timeline)
+    os.replace(tmp_path, os.path.join(timeline_dir, f"{filename}.npz"))
+
+
+# Readable table of one stored series
+def load_timeline(path):
+    with np.load(path) as data:
+        valid = data["key"] >= 0
+        table = pd.DataFrame({
+            "Time (s)": data["times"],
+            "Pitch Entropy": data["entropy"],
+            "Key": np.where(valid, np.array(PITCH_NAMES, dtype=object)[np.maximum(data["key"], 0)], None),
+            "Mode": np.where(valid, np.array(MODES, dtype=object)[np.maximum(data["mode"], 0)], None),
+            "Key Confidence": data["confidence"],
+        })
+        counts = pd.DataFrame(data["counts"], columns=[f"pc_{pitch}" for pitch in range(12)])
+    return pd.concat([table, counts], axis=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print or export a stored pitch timeline.")
+    parser.add_argument("timeline", help="<filename>.npz written by audio_metrics.py --timeline")
+    parser.add_argument("--output", default=None, help="CSV to write (prints to stdout otherwise)")
+    args = parser.parse_args()
+
+    table = load_timeline(args.timeline)
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"Timeline saved to {args.output}")
+    else:
+        print(table.to_string(index=False))
@@ -0,0 +1,58 @@
+import numpy as np
+
+# Rhythm-variability measures from onset inter-onset intervals (IOIs), so
+# audio recordings get rhythmic-contrast metrics without any transcription.
+# The nPVI is the standard Grabe & Low one, which is what nPVI.py reports as
+# "nPVI" for the kern scores (its "nPVI (legacy)" column keeps the original
+# script's formula and is not comparable). For the IOIs d_1..d_m of a file:
+#   nPVI = 100 / (m - 1) * sum |d_k - d_k+1| / ((d_k + d_k+1) / 2)   (Grabe & Low)
+#   rPVI = 1 / (m - 1) * sum |d_k - d_k+1|                          (in ms)
+#   CV   = SD(d) / mean(d)
+# Any number of files is handled in one pass over their concatenated onsets;
+# per-file sums are taken with weighted bincounts over a file-id array. The
+# kern corpus mode of nPVI.py passes every tune at once; audio_metrics
+# analyses one file per worker and calls it with a single file.
+RHYTHM_VARIABILITY_COLUMNS = ['IOI nPVI', 'IOI rPVI (ms)', 'IOI Mean (s)', 'IOI SD (s)', 'IOI CV']
+
+
+# One row of RHYTHM_VARIABILITY_COLUMNS per onset-time array, shape (n_files, 5);
+# NaN where a file has too few onsets for a measure
+def batch_rhythm_variability(onset_time_arrays):
+    n_files = len(onset_time_arrays)
+    lengths = np.array([len(onsets) for onsets in onset_time_arrays], dtype=np.int64)
+    if lengths.sum() == 0:
+        return np.full((n_files, len(RHYTHM_VARIABILITY_COLUMNS)), np.nan)
+    onsets = np.concatenate([np.asarray(onsets, dtype=np.float64) for onsets in onset_time_arrays])
+    file_ids = np.repeat(np.arange(n_files), lengths)
+
+    # IOIs between consecutive onsets of the same file
+    same_file = file_ids[1:] == file_ids[:-1]
+    iois = np.diff(onsets)[same_file]
+    ioi_files = file_ids[1:][same_file]
+
+    # Pairs of consecutive IOIs of the same file
+    same_file = ioi_files[1:] == ioi_files[:-1]
+    first, second = iois[:-1][same_file], iois[1:][same_file]
+    pair_files = ioi_files[1:][same_file]
+    contrast = np.abs(first - second)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normalized = contrast / ((first + second) / 2)
+
+    def per_file(weights, files):
+        return np.bincount(files, weights=weights, minlength=n_files)
+
+    n_iois = np.bincount(ioi_files, minlength=n_files).astype(np.float64)
+    n_pairs = np.bincount(pair_files, minlength=n_files).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        npvi = 100 * per_file(normalized, pair_files) / n_pairs
+        rpvi = 1000 * per_file(contrast, pair_files) / n_pairs
+        mean = per_file(iois, ioi_files) / n_iois
+        variance = per_file(iois ** 2, ioi_files) / n_iois - mean ** 2
+        sd = np.sqrt(np.maximum(variance, 0.0))
+        cv = sd / mean
+    return np.column_stack((npvi, rpvi, mean, sd, cv))
+
+
+# RHYTHM_VARIABILITY_COLUMNS values for a single file
+def rhythm_variability(onset_times):
+    return tuple(batch_rhythm_variability([onset_times])[0])
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import functools
+import pandas as pd
+from contextlib import contextmanager
+from functools import cached_property
+
+# Per-file, per-stage timing and memory traces for the extractors. When
+# tracing is enabled every stage appends one JSON line to the trace file:
+#   {"file", "stage", "wall_s", "cpu_s", "inclusive_wall_s", "rss_delta_mb", "pid", "ts"}
+# wall_s / cpu_s are self times (nested stages are subtracted) so the
+# numbers add up; inclusive_wall_s includes them. The trace path is passed
+# to worker processes through the environment.
+TRACE_ENV_VAR = "AUDIO_TRACE_FILE"
+
+_current_file = None
+_stack = []
+
+
+def trace_path():
+    return os.environ.get(TRACE_ENV_VAR) or None
+
+
+def enable_tracing(path):
+    os.environ[TRACE_ENV_VAR] = os.path.abspath(path)
+
+
+# Current resident set size in MB (falls back to the peak where /proc is unavailable)
+def _rss_mb():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _write(record):
+    with open(trace_path(), "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+# Label every stage recorded inside the block with this file
+@contextmanager
+def traced_file(file_path):
+    global _current_file
+    previous, _current_file = _current_file, os.path.basename(file_path) if file_path else None
+    try:
+        with stage("total"):
+            yield
+    finally:
+        _current_file = previous
+
+
+@contextmanager
+def stage(name):
+    if trace_path() is None:
+        yield
+        return
+    frame = {"child_wall": 0.0, "child_cpu": 0.0}
+    _stack.append(frame)
+    rss_start = _rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        _stack.pop()
+        if _stack:
+            _stack[-1]["child_wall"] += wall
+            _stack[-1]["child_cpu"] += cpu
+        _write({
+            "file": _current_file,
+            "stage": name,
+            "wall_s": wall - frame["child_wall"] if name != "total" else wall,
+            "cpu_s": cpu - frame["child_cpu"] if name != "total" else cpu,
+            "inclusive_wall_s": wall,
+            "rss_delta_mb": _rss_mb() - rss_start,
+            "pid": os.getpid(),
+            "ts": time.time(),
+        })
+
+
+# cached_property whose first computation is recorded as a stage (named after
+# the property unless a name is given: @traced_property(name="load"))
+def traced_property(fn=None, name=None):
+    if fn is None:
+        return functools.partial(traced_property, name=name)
+    stage_name = name or fn.__name__.lstrip("_")
+
+    @functools.wraps(fn)
+    def wrapper(self):
+        with stage(stage_name):
+            return fn(self)
+    return cached_property(wrapper)
+
+
+def load_trace(path):
+    return pd.read_json(path, lines=True)
+
+
+# Slowest stages (summed over files), slowest files, and slowest single stage runs
+def summarize(path, top=10):
+    trace = load_trace(path)
+    if trace.empty:
+        print("Trace is empty.")
+        return
+    stages = trace[trace["stage"] != "total"]
+    totals = trace[trace["stage"] == "total"]
+
+    by_stage = (stages.groupby("stage")
+                      .agg(calls=("wall_s", "size"), wall_s=("wall_s", "sum"), cpu_s=("cpu_s", "sum"),
+                           mean_wall_s=("wall_s", "mean"), max_rss_delta_mb=("rss_delta_mb", "max"))
+                      .sort_values("wall_s", ascending=False))
+    by_stage["share"] = by_stage["wall_s"] / by_stage["wall_s"].sum()
+    print(f"Slowest stages ({len(totals)} file(s) traced):")
+    print(by_stage.head(top).to_string(float_format=lambda v: f"{v:.3f}"))
+
+    if not totals.empty:
+        print("\nSlowest files:")
+        print(totals.sort_values("wall_s", ascending=False)
+                    .head(top)[["file", "wall_s", "cpu_s", "rss_delta_mb"]]
+                    .to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    print("\nSlowest individual stages:")
+    print(stages.sort_values("wall_s", ascending=False)
+                .head(top)[["file", "stage", "wall_s", "cpu_s", "rss_delta_mb"]]
+                .to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize an extraction trace file.")
+    parser.add_argument("trace", help="JSON-lines trace written with --trace / TRACE_FILE")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    summarize(args.trace, args.top)
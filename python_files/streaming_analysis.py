@@ -0,0 +1,185 @@
+import subprocess
+import librosa
+import numpy as np
+from scipy.signal import firwin
+from analysis_context import AudioAnalysisContext, DEFAULT_SR, N_FFT, HOP_LENGTH, RHYTHM_SR, frame_parameters
+from pitch_classes import dominant_midi
+
+# Seconds of audio decoded and analysed per block
+STREAM_BLOCK_SECONDS = 30
+
+# librosa.power_to_db defaults used by onset_strength
+AMIN = 1e-10
+TOP_DB = 80.0
+
+
+# Yield fixed-size float32 blocks from a raw PCM byte stream (a pipe, stdin, ...)
+def read_pcm_blocks(stream, block_samples, dtype=np.float32, channels=1):
+    dtype = np.dtype(dtype)
+    block_bytes = block_samples * channels * dtype.itemsize
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            break
+        usable = len(data) - len(data) % (channels * dtype.itemsize)
+        samples = np.frombuffer(data[:usable], dtype=dtype)
+        if dtype.kind == "i":
+            samples = samples.astype(np.float32) / np.iinfo(dtype).max
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        yield samples.astype(np.float32, copy=False)
+
+
+# Decode any format ffmpeg understands to mono float32 at `sr`, one block at a
+# time, without ever holding the whole recording in memory
+def decoded_blocks(file_path, sr=DEFAULT_SR, block_seconds=STREAM_BLOCK_SECONDS):
+    process = subprocess.Popen(
+        ["ffmpeg", "-v", "error", "-i", file_path, "-f", "f32le", "-ac", "1", "-ar", str(sr), "-"],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        yield from read_pcm_blocks(process.stdout, int(block_seconds * sr))
+    finally:
+        process.stdout.close()
+        process.wait()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {file_path} (exit code {process.returncode})")
+
+
+# Turns consecutive sample blocks into the same frames librosa.stft(center=True)
+# would produce for the whole signal, plus each frame's dominant MIDI note and
+# onset strength. Only the n_fft - hop samples that straddle a block boundary
+# and the previous mel frame are carried over between blocks.
+class StreamingFrameAnalyzer:
+    def __init__(self, sr=DEFAULT_SR, n_fft=N_FFT, hop_length=HOP_LENGTH, rounding=np.rint, track_onsets=True):
+        self.sr = sr
+        self.rounding = rounding
+        self.track_onsets = track_onsets
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.frequencies = librosa.fft_frequencies(sr=sr, n_fft=n_fft)
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft)
+        self.buffer = np.zeros(n_fft // 2, dtype=np.float32)  # center=True zero padding
+        self.previous_mel_db = None
+        self.max_db = -np.inf
+        self.n_samples = 0
+        self.n_frames = 0
+
+    def _frames(self, final=False):
+        if final:
+            self.buffer = np.concatenate((self.buffer, np.zeros(self.n_fft // 2, dtype=np.float32)))
+        if len(self.buffer) < self.n_fft:
+            return np.empty((len(self.frequencies), 0), dtype=np.float32)
+        n_frames = 1 + (len(self.buffer) - self.n_fft) // self.hop_length
+        used = (n_frames - 1) * self.hop_length + self.n_fft
+        magnitude = np.abs(librosa.stft(
+            self.buffer[:used], n_fft=self.n_fft, hop_length=self.hop_length, center=False
+        ))
+        self.buffer = self.buffer[n_frames * self.hop_length:]
+        return magnitude
+
+    # Spectral flux of the log-mel spectrogram (lag 1), like onset_strength.
+    # The 80 dB floor is taken against the loudest frame seen so far rather
+    # than the loudest frame of the whole file.
+    def _onset_strength(self, magnitude):
+        mel_db = 10.0 * np.log10(np.maximum(AMIN, self.mel_basis @ magnitude ** 2))
+        if mel_db.shape[1] > 0:
+            self.max_db = max(self.max_db, mel_db.max())
+        mel_db = np.maximum(mel_db, self.max_db - TOP_DB)
+        previous = mel_db[:, :1] if self.previous_mel_db is None else self.previous_mel_db
+        flux = np.maximum(0.0, np.diff(np.concatenate((previous, mel_db), axis=1), axis=1)).mean(axis=0)
+        if mel_db.shape[1] > 0:
+            self.previous_mel_db = mel_db[:, -1:]
+        return flux.astype(np.float32)
+
+    # Returns (dominant MIDI per frame, onset strength per frame or None) for
+    # the frames completed by this block
+    def process(self, samples, final=False):
+        self.n_samples += len(samples)
+        self.buffer = np.concatenate((self.buffer, samples))
+        magnitude = self._frames(final)
+        self.n_frames += magnitude.shape[1]
+        midi = dominant_midi(magnitude, self.frequencies, rounding=self.rounding)
+        onset = self._onset_strength(magnitude) if self.track_onsets else None
+        return midi, onset
+
+    def finish(self):
+        return self.process(np.empty(0, dtype=np.float32), final=True)
+
+
+# Block-by-block integer-factor downsampling with the filter resample_poly
+# designs for the same ratio (Kaiser window, beta 5, 10 taps per phase on
+# either side), so the output matches analysis_context.polyphase_resample on
+# the whole signal. The last 2 * half_len input samples are carried over.
+class StreamingDownsampler:
+    def __init__(self, orig_sr, target_sr):
+        if orig_sr % target_sr:
+            raise ValueError(f"Streaming resampling needs an integer factor ({orig_sr} -> {target_sr} Hz)")
+        self.factor = orig_sr // target_sr
+        self.half_len = 10 * self.factor
+        self.taps = firwin(2 * self.half_len + 1, 1.0 / self.factor, window=("kaiser", 5.0)).astype(np.float32)
+        self.buffer = np.zeros(self.half_len, dtype=np.float32)  # zeros before the first sample
+        self.buffer_start = -self.half_len  # input index of buffer[0]
+        self.n_samples = 0
+        self.n_out = 0
+
+    def process(self, samples, final=False):
+        self.n_samples += len(samples)
+        self.buffer = np.concatenate((self.buffer, samples))
+        if final:
+            self.buffer = np.concatenate((self.buffer, np.zeros(2 * self.half_len, dtype=np.float32)))
+        if len(self.buffer) < len(self.taps):
+            return np.empty(0, dtype=np.float32)
+        # Output n is centred on input n * factor and needs half_len samples either side
+        first = self.n_out * self.factor - self.half_len - self.buffer_start
+        windows = np.lib.stride_tricks.sliding_window_view(self.buffer, len(self.taps))[first::self.factor]
+        if final:
+            windows = windows[:max(0, -(-self.n_samples // self.factor) - self.n_out)]
+        out = (windows @ self.taps).astype(np.float32)
+        self.n_out += len(out)
+        drop = self.n_out * self.factor - self.half_len - self.buffer_start
+        self.buffer = self.buffer[drop:]
+        self.buffer_start += drop
+        return out
+
+
+# Build an AudioAnalysisContext for a file without loading it whole. What is
+# kept per file are the frame-rate tracks (int16 dominant MIDI and float32
+# onset strength, ~260 bytes per second of audio); the signal and STFT only
+# ever exist one block at a time. As in the full analysis, onsets come from
+# a RHYTHM_SR copy of the signal, attached to the context as its RHYTHM_SR
+# analysis (see AudioAnalysisContext.at_rate).
+def streamed_context(file_path, sr=DEFAULT_SR, block_seconds=STREAM_BLOCK_SECONDS, rhythm_sr=RHYTHM_SR):
+    analyzer = StreamingFrameAnalyzer(sr=sr, track_onsets=False)
+    n_fft, hop_length = frame_parameters(rhythm_sr)
+    downsampler = StreamingDownsampler(sr, rhythm_sr)
+    rhythm_analyzer = StreamingFrameAnalyzer(sr=rhythm_sr, n_fft=n_fft, hop_length=hop_length)
+    midi_blocks, onset_blocks = [], []
+    for samples in decoded_blocks(file_path, sr=sr, block_seconds=block_seconds):
+        midi_blocks.append(analyzer.process(samples)[0])
+        onset_blocks.append(rhythm_analyzer.process(downsampler.process(samples))[1])
+    midi_blocks.append(analyzer.finish()[0])
+    onset_blocks.append(rhythm_analyzer.process(downsampler.process(np.empty(0, dtype=np.float32), final=True),
+                                                final=True)[1])
+
+    # onset_strength(center=True) delays the envelope by n_fft // (2 * hop) frames
+    delay = n_fft // (2 * hop_length)
+    onset_envelope = np.concatenate([np.zeros(delay, dtype=np.float32)] + onset_blocks)[:rhythm_analyzer.n_frames]
+
+    ctx = AudioAnalysisContext(
+        file_path,
+        sr=sr,
+        duration=analyzer.n_samples / sr,
+        n_frames=analyzer.n_frames,
+        dominant_midi=np.concatenate(midi_blocks),
+    )
+    ctx.add_rate(AudioAnalysisContext(
+        file_path,
+        sr=rhythm_sr,
+        n_fft=n_fft,
+        hop_length=hop_length,
+        duration=rhythm_analyzer.n_samples / rhythm_sr,
+        n_frames=rhythm_analyzer.n_frames,
+        onset_envelope=onset_envelope,
+    ))
+    return ctx
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import resource
+import subprocess
+import multiprocessing
+from multiprocessing.connection import wait
+
+# Crash-isolated extraction. Every file runs in its own worker process with a
+# wall-clock timeout and a memory ceiling, up to max_workers at a time. The
+# ceiling is set as RLIMIT_AS where the OS allows it (a clean MemoryError in
+# the worker), and the supervisor also polls every worker's resident memory
+# and kills it past the limit, which is what enforces it on macOS. A worker that raises, runs out of
+# memory, is killed by a signal or overruns its timeout only loses its own
+# file: the supervisor records the reason and starts the next file, so the
+# run keeps its full parallelism. A fresh process per file also means a
+# leaking or wedged librosa call can never affect later files.
+DEFAULT_TIMEOUT_S = 30 * 60
+POLL_INTERVAL_S = 0.5
+
+
+def _worker(compute, file_path, conn, memory_limit_mb):
+    if memory_limit_mb:
+        limit = int(memory_limit_mb * 1024 * 1024)
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+    try:
+        conn.send(("ok", compute(file_path)))
+    except MemoryError:
+        conn.send(("error", f"memory limit of {memory_limit_mb} MB exceeded"))
+    except Exception as e:
+        conn.send(("error", repr(e)))
+    finally:
+        conn.close()
+
+
+# Resident set size of a process in MB, or None if it can't be read
+def _rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        output = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True).stdout
+        return int(output.strip()) / 1024  # KB
+    except (OSError, ValueError):
+        return None
+
+
+def _exit_reason(process):
+    if process.exitcode is not None and process.exitcode < 0:
+        return f"crashed (killed by signal {-process.exitcode})"
+    return f"crashed (exit code {process.exitcode})"
+
+
+# Run compute(path) for every path in its own supervised process, in the given
+# order. on_row(path, result) is called for every success and
+# on_failure(path, reason) for every timeout, crash or exception. Returns the
+# failures as (path, reason) pairs.
+def run_supervised(file_paths, compute, max_workers=1, timeout=DEFAULT_TIMEOUT_S, memory_limit_mb=None,
+                   on_row=None, on_failure=None):
+    queue = list(file_paths)[::-1]
+    running = {}  # connection -> (path, process, deadline)
+    failures = []
+    done = 0
+
+    def finish(conn, reason=None, result=None):
+        nonlocal done
+        path, process, _ = running.pop(conn)
+        conn.close()
+        process.join(timeout=5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        done += 1
+        if reason is None:
+            if on_row:
+                on_row(path, result)
+            print(f"✅ [{done}/{len(file_paths)}] {os.path.basename(path)}")
+        else:
+            failures.append((path, reason))
+            if on_failure:
+                on_failure(path, reason)
+            print(f"❌ [{done}/{len(file_paths)}] {path}: {reason}")
+
+    while queue or running:
+        while queue and len(running) < max_workers:
+            path = queue.pop()
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_worker, args=(compute, path, sender, memory_limit_mb),
+                                              daemon=True)
+            process.start()
+            sender.close()
+            running[receiver] = (path, process, time.monotonic() + timeout if timeout else None)
+
+        for conn in wait(list(running), timeout=POLL_INTERVAL_S):
+            try:
+                status, payload = conn.recv()
+            except EOFError:
+                finish(conn, reason=_exit_reason(running[conn][1]))
+                continue
+            if status == "ok":
+                finish(conn, result=payload)
+            else:
+                finish(conn, reason=payload)
+
+        now = time.monotonic()
+        for conn, (path, process, deadline) in list(running.items()):
+            if deadline is not None and now > deadline:
+                process.kill()
+                finish(conn, reason=f"timed out after {timeout:g} s")
+            elif memory_limit_mb:
+                rss = _rss_mb(process.pid)
+                if rss is not None and rss > memory_limit_mb:
+                    process.kill()
+                    finish(conn, reason=f"memory limit of {memory_limit_mb:g} MB exceeded ({rss:.0f} MB resident)")
+    return failures
+
+
+# Files that timed out or crashed, with the reason, keyed by content hash so a
+# replaced or repaired file is tried again. Saved atomically after every change.
+class Quarantine:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                try:
+                    self.entries = json.load(f)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Quarantine list {path} is corrupted. Starting from an empty list.")
+
+    def __contains__(self, content_hash):
+        return content_hash in self.entries
+
+    def add(self, content_hash, file_path, reason):
+        self.entries[content_hash] = {
+            "filename": os.path.basename(file_path),
+            "path": file_path,
+            "reason": reason,
+            "quarantined": time.time(),
+        }
+        self.save()
+
+    def remove(self, content_hash):
+        if self.entries.pop(content_hash, None) is not None:
+            self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self.path)